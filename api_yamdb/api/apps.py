@@ -1,6 +1,31 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        import api.checks  # noqa: F401
+        from api.cache import (invalidate_model_cache,
+                               invalidate_username_cache)
+        from api.db import check_persistent_connections
+        from api.user_auth_utils import forget_token_state
+        from reviews.models import (Category, Comment, Genre, GenreTitle,
+                                    Review, Title)
+
+        # Сохранение и удаление через представления и админку
+        for model in (Category, Comment, Genre, GenreTitle, Review, Title):
+            post_save.connect(invalidate_model_cache, sender=model)
+            post_delete.connect(invalidate_model_cache, sender=model)
+        # В ответах только имя автора. post_delete не нужен: удаление
+        # пользователя удаляет его отзывы и комментарии
+        post_save.connect(invalidate_username_cache, sender=get_user_model())
+        # title.genre.set() создаёт связи через bulk_create, без post_save
+        m2m_changed.connect(invalidate_model_cache, sender=GenreTitle)
+        post_save.connect(forget_token_state, sender=get_user_model())
+        post_delete.connect(forget_token_state, sender=get_user_model())
+        request_started.connect(check_persistent_connections)
@@ -0,0 +1,64 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from api.user_auth_utils import get_token_state
+from users.constants import ROLE_CLAIM, TOKEN_VERSION_CLAIM, Roles
+
+
+class YamdbTokenUser(TokenUser):
+    """Пользователь, восстановленный из утверждений токена без запроса к БД."""
+
+    @property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @property
+    def is_admin(self):
+        """Возвращает True, если у пользователя права администратора."""
+        return self.role == Roles.ADMIN or self.is_superuser or self.is_staff
+
+    @property
+    def is_moderator(self):
+        """Возвращает True, если у пользователя права модератора."""
+        return self.role == Roles.MODERATOR
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация по утверждениям токена.
+
+    Токены, выданные get_tokens_for_user, содержат роль и флаги
+    пользователя, поэтому пользователь строится из токена без загрузки
+    модели: из БД или кэша читаются только версия токенов и флаг
+    is_active (см. get_token_state). Токен с устаревшей версией, то есть
+    выданный до изменения роли пользователя (см. revoke_user_tokens),
+    отклоняется. Токены без утверждений обрабатываются как раньше,
+    с загрузкой пользователя из БД.
+    """
+
+    def get_user(self, validated_token):
+        if ROLE_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                "Token contained no recognizable user identification"
+            )
+        state = get_token_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+        token_version, is_active = state
+        if not is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != token_version:
+            raise InvalidToken("Токен отозван, получите новый токен")
+        return YamdbTokenUser(validated_token)
@@ -0,0 +1,148 @@
+"""
+Массовое создание и обновление произведений.
+
+Слаги категорий и жанров всех элементов разрешаются одним запросом
+на каждый тип, произведения и связи с жанрами записываются через
+bulk_create и bulk_update в одной транзакции. Ошибки возвращаются
+для каждого элемента отдельно, корректные элементы сохраняются.
+"""
+
+from django.db import connection, transaction
+
+from api.cache import bump_cache_version
+from api.serializers import TitleBulkItemSerializer
+from reviews.models import Category, Genre, GenreTitle, Title, TitleScore
+
+BULK_BATCH_SIZE = 1000
+
+TITLE_UPDATE_FIELDS = ("name", "year", "description", "category")
+
+
+def validate_items(items):
+    """Проверяем элементы по отдельности, без запросов к БД."""
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        serializer = TitleBulkItemSerializer(
+            data=item, partial=isinstance(item, dict) and "id" in item
+        )
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors[index] = serializer.errors
+    return valid, errors
+
+
+def resolve_references(valid):
+    """Одним запросом на тип получаем категории, жанры и произведения."""
+    category_slugs, genre_slugs, title_ids = set(), set(), set()
+    for _, data in valid:
+        if "category" in data:
+            category_slugs.add(data["category"])
+        genre_slugs.update(data.get("genre", ()))
+        if "id" in data:
+            title_ids.add(data["id"])
+    return (
+        dict(Category.objects.filter(
+            slug__in=category_slugs
+        ).values_list("slug", "pk")),
+        dict(Genre.objects.filter(
+            slug__in=genre_slugs
+        ).values_list("slug", "pk")),
+        Title.objects.in_bulk(title_ids),
+    )
+
+
+def build_title(data, categories, genres, titles):
+    """Собираем объект произведения и id его жанров или ошибки."""
+    errors = {}
+    title = Title()
+    if "id" in data:
+        title = titles.get(data["id"])
+        if title is None:
+            errors["id"] = [f"Произведение {data['id']} не найдено."]
+    if "category" in data and data["category"] not in categories:
+        errors["category"] = [f"Категория {data['category']} не найдена."]
+    missing = [slug for slug in data.get("genre", ()) if slug not in genres]
+    if missing:
+        errors["genre"] = [f"Жанр {slug} не найден." for slug in missing]
+    if errors:
+        return None, None, errors
+
+    for field in ("name", "year", "description"):
+        if field in data:
+            setattr(title, field, data[field])
+    if "category" in data:
+        title.category_id = categories[data["category"]]
+    genre_ids = None
+    if "genre" in data:
+        genre_ids = list(dict.fromkeys(
+            genres[slug] for slug in data["genre"]
+        ))
+    return title, genre_ids, None
+
+
+def insert_titles(titles):
+    if connection.features.can_return_rows_from_bulk_insert:
+        Title.objects.bulk_create(titles, batch_size=BULK_BATCH_SIZE)
+        TitleScore.objects.create_empty(titles)
+    else:
+        # bulk_create не возвращает id на этой СУБД, а они нужны для связей
+        # с жанрами; гистограмму оценок создаёт сигнал post_save
+        for title in titles:
+            title.save(force_insert=True)
+
+
+def write_titles(created, updated, genre_links):
+    # Жанры обновляемых произведений заменяются целиком
+    replaced = [title.pk for title, _ in genre_links if title.pk is not None]
+    with transaction.atomic():
+        insert_titles(created)
+        Title.objects.bulk_update(
+            updated, TITLE_UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE
+        )
+        GenreTitle.objects.filter(title__in=replaced).delete()
+        GenreTitle.objects.bulk_create((
+            GenreTitle(title_id=title.pk, genre_id=genre_id)
+            for title, genre_ids in genre_links for genre_id in genre_ids
+        ), batch_size=BULK_BATCH_SIZE)
+    # bulk_create и bulk_update не вызывают сигналы, сбрасывающие кэш
+    bump_cache_version(Title)
+    bump_cache_version(GenreTitle)
+
+
+def bulk_save_titles(items):
+    """Сохраняем элементы и возвращаем результат по каждому из них."""
+    valid, errors = validate_items(items)
+    categories, genres, titles = resolve_references(valid)
+    created, updated, saved = [], [], []
+    # Ключ - сам объект: повторный id в запросе даёт тот же объект
+    genre_links = {}
+    for index, data in valid:
+        title, genre_ids, item_errors = build_title(
+            data, categories, genres, titles
+        )
+        if item_errors:
+            errors[index] = item_errors
+            continue
+        (updated if "id" in data else created).append(title)
+        if genre_ids is not None:
+            genre_links[id(title)] = (title, genre_ids)
+        saved.append((index, title, "id" in data))
+    write_titles(created, updated, list(genre_links.values()))
+
+    results = [
+        {"index": index, "id": title.pk,
+         "status": "updated" if is_update else "created"}
+        for index, title, is_update in saved
+    ]
+    results.extend(
+        {"index": index, "errors": item_errors}
+        for index, item_errors in errors.items()
+    )
+    results.sort(key=lambda result: result["index"])
+    return {
+        "created": len(created),
+        "updated": len(updated),
+        "failed": len(errors),
+        "results": results,
+    }
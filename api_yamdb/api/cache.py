@@ -0,0 +1,178 @@
+"""
+Версии моделей и кэш ответов со списками справочников.
+
+Ключ ответа содержит версию модели, поэтому при изменении данных
+достаточно увеличить версию: старые записи перестают читаться
+и удаляются кэшем по истечении таймаута, без перебора ключей.
+Версии и время изменения моделей также служат валидаторами
+условных GET-запросов (ETag и Last-Modified).
+
+Версии меняются в процессе, который изменил данные, поэтому кэш
+RESPONSE_CACHE_ALIAS должен быть общим для всех процессов; с кэшем
+в памяти процесса кэш ответов и условные GET-запросы отключаются.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = "api:list-version:{label}"
+MODIFIED_KEY = "api:list-modified:{label}"
+RESPONSE_KEY = "api:list:{label}:{version}:{digest}"
+
+# Бэкенды, кэш которых не виден другим процессам
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Сколько объектов каждой модели хранит кэш слагов
+SLUG_CACHE_MAX_SIZE = 1024
+
+# Сколько секунд кэш слагов модели используется без обновления
+SLUG_CACHE_TIMEOUT = 60
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def is_shared_cache(alias):
+    """Виден ли кэш с этим алиасом всем процессам."""
+    return settings.CACHES[alias]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+def get_cache_version(model):
+    """Текущая версия кэша модели."""
+    key = VERSION_KEY.format(label=model._meta.label_lower)
+    # Начальная версия зависит от времени, чтобы после вытеснения
+    # счётчика из кэша не прочитать записи с совпадающей старой версией
+    return get_cache().get_or_set(
+        key, time.time_ns(), timeout=settings.RESPONSE_CACHE_TIMEOUT
+    )
+
+
+def bump_cache_version(model):
+    """Сбрасываем кэш модели, увеличивая её версию."""
+    cache = get_cache()
+    key = VERSION_KEY.format(label=model._meta.label_lower)
+    # incr сохраняет оставшийся срок жизни ключа, поэтому новая версия
+    # записывается целиком
+    cache.set_many({
+        key: time.time_ns(),
+        MODIFIED_KEY.format(label=model._meta.label_lower): time.time(),
+    }, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def get_cache_state(models):
+    """
+    Версии и время последнего изменения моделей за один запрос к кэшу.
+
+    Для моделей без сохранённого состояния оно создаётся: новая версия
+    и текущее время изменения.
+    """
+    cache = get_cache()
+    labels = [model._meta.label_lower for model in models]
+    version_keys = [VERSION_KEY.format(label=label) for label in labels]
+    modified_keys = [MODIFIED_KEY.format(label=label) for label in labels]
+    values = cache.get_many(version_keys + modified_keys)
+    missing = {key: time.time_ns() for key in version_keys
+               if key not in values}
+    missing.update({key: time.time() for key in modified_keys
+                    if key not in values})
+    if missing:
+        cache.set_many(missing, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        values.update(missing)
+    return (
+        [values[key] for key in version_keys],
+        max(values[key] for key in modified_keys),
+    )
+
+
+def get_response_cache_key(model, request):
+    """Ключ ответа: версия модели и полный адрес запроса."""
+    digest = hashlib.md5(
+        request.build_absolute_uri().encode("utf-8")
+    ).hexdigest()
+    return RESPONSE_KEY.format(
+        label=model._meta.label_lower,
+        version=get_cache_version(model),
+        digest=digest,
+    )
+
+
+def invalidate_model_cache(sender, **kwargs):
+    """Обработчик сигналов post_save и post_delete."""
+    bump_cache_version(sender)
+
+
+def invalidate_username_cache(sender, instance, created, **kwargs):
+    """
+    Обработчик post_save пользователя.
+
+    Ответы с отзывами и комментариями содержат только имя автора,
+    поэтому версия пользователей меняется только вместе с username.
+    """
+    if not created and (
+            instance.__dict__.get("username") != instance.saved_username):
+        bump_cache_version(sender)
+    instance.remember_username()
+
+
+class SlugObjectCache:
+    """
+    Кэш объектов по слагу в памяти процесса.
+
+    Размер кэша каждой модели ограничен, вытесняются давно не
+    использованные объекты. Кэш модели сбрасывается, когда меняется
+    её версия, и не реже чем раз в timeout секунд: изменения из других
+    процессов видны сразу только при общем кэше версий (см. api.checks).
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get_many(self, queryset, slug_field, slugs):
+        """Объекты по слагам; отсутствующие в кэше - одним запросом."""
+        key = (queryset.model._meta.label_lower, slug_field)
+        version = get_cache_version(queryset.model)
+        now = time.monotonic()
+        with self.lock:
+            entry_version, expires, objects = self.entries.get(
+                key, (None, None, None)
+            )
+            if entry_version != version or expires <= now:
+                objects = OrderedDict()
+                self.entries[key] = (version, now + self.timeout, objects)
+            found = {}
+            for slug in slugs:
+                if slug in objects:
+                    objects.move_to_end(slug)
+                    found[slug] = objects[slug]
+        missing = set(slugs) - found.keys()
+        if not missing:
+            return found
+        fetched = {
+            getattr(obj, slug_field): obj
+            for obj in queryset.filter(**{f"{slug_field}__in": missing})
+        }
+        found.update(fetched)
+        with self.lock:
+            objects.update(fetched)
+            while len(objects) > self.max_size:
+                objects.popitem(last=False)
+        return found
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+slug_cache = SlugObjectCache(SLUG_CACHE_MAX_SIZE, SLUG_CACHE_TIMEOUT)
@@ -0,0 +1,36 @@
+"""Проверки настроек кэша для нескольких процессов."""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from api.cache import is_shared_cache
+
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """
+    Версии моделей (api.cache) должны быть общими для всех процессов,
+    иначе кэш ответов и условные GET-запросы отключаются.
+    """
+    if is_shared_cache(settings.RESPONSE_CACHE_ALIAS):
+        return []
+    return [Warning(
+        "RESPONSE_CACHE_ALIAS указывает на кэш в памяти процесса, кэш "
+        "ответов и условные GET-запросы отключены.",
+        hint="Укажите общий для процессов кэш, например shared.",
+        id="api.W001",
+    )]
+
+
+@register(Tags.caches)
+def check_token_state_cache(app_configs, **kwargs):
+    """Сброс состояния токенов должен быть виден всем процессам."""
+    alias = settings.TOKEN_STATE_CACHE_ALIAS
+    if not alias or is_shared_cache(alias):
+        return []
+    return [Error(
+        "TOKEN_STATE_CACHE_ALIAS указывает на кэш в памяти процесса.",
+        hint=("Укажите общий кэш, например shared, или пустое значение, "
+              "тогда версия токенов читается из БД."),
+        id="api.E001",
+    )]
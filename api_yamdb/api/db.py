@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import connections
+
+
+def check_persistent_connections(**kwargs):
+    """
+    Закрываем постоянные соединения, которые перестали работать.
+
+    Обработчик сигнала request_started. Без проверки первый запрос после
+    перезапуска БД или пулера получает ошибку на разорванном соединении.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict["CONN_MAX_AGE"]
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
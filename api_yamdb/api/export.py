@@ -0,0 +1,112 @@
+"""
+Потоковая выгрузка данных в CSV и NDJSON.
+
+Строки читаются через .iterator(), в PostgreSQL - серверным курсором,
+поэтому расход памяти не зависит от размера таблицы. CSV содержит
+все поля модели с заголовками в формате static/data и загружается
+обратно командой import_data.
+"""
+
+import csv
+from collections import defaultdict
+from itertools import islice
+
+from django.db import models
+
+from api.fast_serializers import to_datetime
+from reviews.models import Comment, GenreTitle, Review, Title
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_BATCH_SIZE = 100
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ModelExport:
+    """Выгрузка всех полей модели, внешние ключи - по id."""
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = model._meta.concrete_fields
+        self.columns = [field.attname for field in self.fields]
+        self.converters = [
+            to_datetime if isinstance(field, models.DateTimeField) else None
+            for field in self.fields
+        ]
+
+    def chunks(self, queryset, *lookups):
+        """Строки queryset порциями по EXPORT_CHUNK_SIZE."""
+        rows = queryset.order_by("pk").values_list(*lookups).iterator(
+            chunk_size=EXPORT_CHUNK_SIZE
+        )
+        return iter(lambda: list(islice(rows, EXPORT_CHUNK_SIZE)), [])
+
+    def rows(self):
+        converters = self.converters
+        for chunk in self.chunks(self.model.objects.all(), *self.columns):
+            for row in chunk:
+                yield [
+                    value if convert is None or value is None
+                    else convert(value)
+                    for value, convert in zip(row, converters)
+                ]
+
+    def csv_lines(self):
+        """Строки CSV порциями по EXPORT_BATCH_SIZE."""
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.columns)
+        rows = self.rows()
+        for batch in iter(lambda: list(islice(rows, EXPORT_BATCH_SIZE)), []):
+            yield "".join(
+                writer.writerow(
+                    "" if value is None else value for value in row
+                ) for row in batch
+            )
+
+    def ndjson_items(self):
+        columns = self.columns
+        for row in self.rows():
+            yield dict(zip(columns, row))
+
+
+class TitleExport(ModelExport):
+    """
+    Произведения. В NDJSON - со слагами категории и жанров, в формате
+    элементов /titles/bulk/; жанры в CSV выгружаются отдельно.
+    """
+
+    ndjson_lookups = (
+        "id", "name", "year", "description", "rating", "category__slug"
+    )
+
+    def ndjson_items(self):
+        for chunk in self.chunks(Title.objects.all(), *self.ndjson_lookups):
+            genres = defaultdict(list)
+            for title_id, slug in GenreTitle.objects.filter(
+                title_id__in=[row[0] for row in chunk]
+            ).order_by("genre__slug").values_list("title_id", "genre__slug"):
+                genres[title_id].append(slug)
+            for title_id, name, year, description, rating, category in chunk:
+                yield {
+                    "id": title_id,
+                    "name": name,
+                    "year": year,
+                    "description": description,
+                    "rating": rating,
+                    "category": category,
+                    "genre": genres[title_id],
+                }
+
+
+EXPORTS = {
+    "titles": TitleExport(Title),
+    "genre_titles": ModelExport(GenreTitle),
+    "reviews": ModelExport(Review),
+    "comments": ModelExport(Comment),
+}
@@ -0,0 +1,130 @@
+"""
+Сериализаторы только для чтения поверх values_list.
+
+Используются в list и retrieve вместо ModelSerializer: строки запроса
+не превращаются в экземпляры моделей, а соответствие колонок ключам
+ответа вычисляется один раз. Ответ совпадает с ответом обычных
+сериализаторов, это проверяют тесты.
+"""
+
+from collections import defaultdict
+
+from rest_framework import serializers
+
+from reviews.models import GenreTitle
+
+to_datetime = serializers.DateTimeField().to_representation
+
+
+class ValuesSerializer:
+    """
+    Базовый сериализатор строк values_list.
+
+    fields - пары (ключ ответа, поле queryset) в порядке ключей ответа.
+    Поле None означает вычисляемый ключ: его значение возвращает метод
+    get_<ключ>(row), которому доступны колонки extra_lookups.
+    converters - преобразования значений, не равных None, по ключу.
+    """
+
+    fields = ()
+    extra_lookups = ()
+    converters = {}
+
+    def __init__(self):
+        self.lookups = [lookup for _, lookup in self.fields if lookup]
+        self.lookups.extend(self.extra_lookups)
+        self.mapping = []
+        index = 0
+        for key, lookup in self.fields:
+            if lookup is None:
+                self.mapping.append((key, None, getattr(self, f"get_{key}")))
+                continue
+            self.mapping.append((key, index, self.converters.get(key)))
+            index += 1
+
+    def prepare(self, queryset):
+        """Queryset строк с именованными колонками."""
+        return queryset.prefetch_related(None).values_list(
+            *self.lookups, named=True
+        )
+
+    def load_related(self, rows):
+        """Загрузка связанных данных для страницы строк."""
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        self.load_related(rows)
+        mapping = self.mapping
+        data = []
+        for row in rows:
+            item = {}
+            for key, index, convert in mapping:
+                if index is None:
+                    item[key] = convert(row)
+                    continue
+                value = row[index]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[key] = value
+            data.append(item)
+        return data
+
+
+class TitleValuesSerializer(ValuesSerializer):
+    """Произведения: поля TitleSerializer."""
+
+    fields = (
+        ("id", "id"),
+        ("name", "name"),
+        ("year", "year"),
+        ("rating", "rating"),
+        ("description", "description"),
+        ("genre", None),
+        ("category", None),
+    )
+    extra_lookups = ("category__name", "category__slug")
+    # TitleSerializer отдаёт рейтинг как IntegerField
+    converters = {"rating": int}
+
+    def load_related(self, rows):
+        self.genres = defaultdict(list)
+        links = GenreTitle.objects.filter(
+            title_id__in=[row.id for row in rows]
+        ).order_by("genre__slug").values_list(
+            "title_id", "genre__name", "genre__slug"
+        )
+        for title_id, name, slug in links:
+            self.genres[title_id].append({"name": name, "slug": slug})
+
+    def get_genre(self, row):
+        return self.genres[row.id]
+
+    def get_category(self, row):
+        if row.category__slug is None:
+            return None
+        return {"name": row.category__name, "slug": row.category__slug}
+
+
+class ReviewValuesSerializer(ValuesSerializer):
+    """Отзывы: поля ReviewSerializer."""
+
+    fields = (
+        ("id", "id"),
+        ("text", "text"),
+        ("author", "author__username"),
+        ("score", "score"),
+        ("pub_date", "pub_date"),
+    )
+    converters = {"pub_date": to_datetime}
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """Комментарии: поля CommentSerializer."""
+
+    fields = (
+        ("id", "id"),
+        ("text", "text"),
+        ("author", "author__username"),
+        ("pub_date", "pub_date"),
+    )
+    converters = {"pub_date": to_datetime}
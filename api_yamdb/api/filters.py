@@ -1,4 +1,9 @@
 from django_filters.rest_framework import CharFilter, FilterSet, NumberFilter
+from rest_framework.filters import SearchFilter
+
+from api.search import search
+
+TITLE_SEARCH_FIELDS = ("name", "description")
 
 
 class TitleFilter(FilterSet):
@@ -8,3 +13,19 @@ class TitleFilter(FilterSet):
     category = CharFilter(field_name="category__slug")
     name = CharFilter(field_name="name", lookup_expr="icontains")
     year = NumberFilter(field_name="year")
+    search = CharFilter(method="filter_search")
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+        return search(queryset, TITLE_SEARCH_FIELDS, value)
+
+
+class RelevanceSearchFilter(SearchFilter):
+    """SearchFilter, использующий бэкенд поиска вместо icontains."""
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+        return search(queryset, search_fields, " ".join(search_terms))
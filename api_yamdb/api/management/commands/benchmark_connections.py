@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+
+class Command(BaseCommand):
+    help = ("Сравнение запросов в секунду с новым соединением с БД на "
+            "каждый запрос и с постоянным соединением. Запросы проходят "
+            "через WSGI-обработчик со всеми сигналами, но без сети.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default="/api/v1/titles/",
+            help="Адрес GET-запроса",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Количество запросов в каждом режиме",
+        )
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=60,
+            help="CONN_MAX_AGE для режима постоянного соединения",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["max_age"] < 1:
+            raise CommandError(
+                "--requests и --max-age должны быть положительными"
+            )
+        handler = WSGIHandler()
+        host = (settings.ALLOWED_HOSTS or [""])[0].lstrip(".*") or "localhost"
+        factory = RequestFactory(HTTP_HOST=host)
+        initial_max_age = connection.settings_dict["CONN_MAX_AGE"]
+        try:
+            for label, max_age in (("Без постоянных соединений", 0),
+                                   ("CONN_MAX_AGE=" + str(options["max_age"]),
+                                    options["max_age"])):
+                connection.close()
+                connection.settings_dict["CONN_MAX_AGE"] = max_age
+                rate = self.measure(
+                    handler, factory, options["url"], options["requests"]
+                )
+                self.stdout.write(f"{label}: {rate:.0f} запросов/с")
+        finally:
+            connection.close()
+            connection.settings_dict["CONN_MAX_AGE"] = initial_max_age
+
+    def measure(self, handler, factory, url, requests):
+        started = time.perf_counter()
+        for number in range(requests):
+            # Уникальный параметр, чтобы ответ не брался из кэша
+            environ = factory.get(url, {"benchmark": number}).environ
+            response = handler(environ, self.start_response)
+            status = response.status_code
+            # close() отправляет request_finished: соединение закрывается
+            # или остаётся открытым в зависимости от CONN_MAX_AGE
+            response.close()
+            if status >= 400:
+                raise CommandError(f"{url}: ответ со статусом {status}")
+        return requests / (time.perf_counter() - started)
+
+    @staticmethod
+    def start_response(status, headers):
+        pass
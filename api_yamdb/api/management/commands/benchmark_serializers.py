@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.fast_serializers import (CommentValuesSerializer,
+                                  ReviewValuesSerializer,
+                                  TitleValuesSerializer)
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleSerializer)
+from api.views import TitleViewSet
+from reviews.models import Comment, Review
+
+
+class Command(BaseCommand):
+    help = ("Сравнение скорости ModelSerializer и сериализаторов "
+            "values_list на данных из БД: объектов в секунду, "
+            "включая время запросов.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=1000,
+            help="Количество объектов каждой модели",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Количество повторов, берётся лучший результат",
+        )
+
+    def handle(self, *args, **options):
+        if options["limit"] < 1 or options["repeat"] < 1:
+            raise CommandError("--limit и --repeat должны быть положительными")
+        cases = (
+            ("Title", TitleViewSet.queryset, TitleSerializer,
+             TitleValuesSerializer),
+            ("Review", Review.objects.select_related("author"),
+             ReviewSerializer, ReviewValuesSerializer),
+            ("Comment", Comment.objects.select_related("author"),
+             CommentSerializer, CommentValuesSerializer),
+        )
+        self.stdout.write("Модель".ljust(10) + "Объектов".rjust(10)
+                          + "DRF, об/с".rjust(14) + "values, об/с".rjust(14)
+                          + "Ускорение".rjust(11))
+        for name, queryset, serializer_class, fast_serializer_class in cases:
+            queryset = queryset.order_by("pk")[:options["limit"]]
+            count = queryset.count()
+            if not count:
+                self.stdout.write(f"{name}: нет данных")
+                continue
+            fast_serializer = fast_serializer_class()
+            drf_seconds = self.measure(
+                lambda: serializer_class(queryset.all(), many=True).data,
+                options["repeat"],
+            )
+            fast_seconds = self.measure(
+                lambda: fast_serializer.to_representation(
+                    fast_serializer.prepare(queryset.all())
+                ),
+                options["repeat"],
+            )
+            self.stdout.write(
+                name.ljust(10) + str(count).rjust(10)
+                + f"{count / drf_seconds:.0f}".rjust(14)
+                + f"{count / fast_seconds:.0f}".rjust(14)
+                + f"{drf_seconds / fast_seconds:.1f}x".rjust(11)
+            )
+
+    @staticmethod
+    def measure(function, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
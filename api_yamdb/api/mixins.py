@@ -1,10 +1,165 @@
+import hashlib
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from rest_framework import mixins, viewsets
-from rest_framework.filters import SearchFilter
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
 
+from api.cache import (get_cache, get_cache_state, get_response_cache_key,
+                       is_shared_cache)
+from api.filters import RelevanceSearchFilter
 from api.permissions import IsAdminOrReadOnly
+from api.renderers import StreamingJSONResponse
+
+User = get_user_model()
+
+
+class ConditionalListMixin:
+    """
+    Условные GET-запросы для list.
+
+    ETag строится из адреса запроса, формата ответа, режима пагинации
+    и версий моделей из cache_dependencies, Last-Modified - из времени
+    их изменения.
+    Оба валидатора берутся из кэша, поэтому ответ 304 отдаётся
+    до запросов к БД и сериализации. С кэшем в памяти процесса
+    условные запросы отключены.
+    """
+
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(super().list, request, *args, **kwargs)
+
+    def get_list_mode(self, request):
+        """Вид ответа по тому же адресу: страница, курсор или весь список."""
+        paginator = self.paginator
+        # Администратор получает весь список, остальные - страницу
+        if hasattr(paginator, "unpaginated") and paginator.unpaginated(
+                request):
+            return "unpaginated"
+        # Режим курсора включается и заголовком, а не только адресом
+        if hasattr(paginator, "use_cursor") and paginator.use_cursor(request):
+            return "cursor"
+        return ""
+
+    def get_validators(self, request):
+        versions, modified = get_cache_state(self.cache_dependencies)
+        etag = hashlib.md5(" ".join((
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            self.get_list_mode(request),
+            *map(str, versions),
+        )).encode("utf-8")).hexdigest()
+        return quote_etag(etag), int(modified)
+
+    def conditional_get(self, handler, request, *args, **kwargs):
+        if not is_shared_cache(settings.RESPONSE_CACHE_ALIAS):
+            # Версии в памяти процесса не видят изменений из других
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            mode_header = getattr(self.paginator, "mode_header", None)
+            if mode_header:
+                patch_vary_headers(response, (mode_header,))
+        return response
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    """Условные GET-запросы для list и retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_get(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class FastReadMixin:
+    """
+    list и retrieve через сериализатор строк values_list.
+
+    fast_serializer_class - наследник api.fast_serializers.ValuesSerializer,
+    повторяющий поля serializer_class. Запись идёт через serializer_class.
+    Список без пагинации отдаётся потоком, порциями по stream_chunk_size.
+    """
+
+    fast_serializer_class = None
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.fast_serializer_class()
+        queryset = serializer.prepare(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+        return StreamingJSONResponse(self.stream_rows(serializer, queryset))
+
+    def stream_rows(self, serializer, queryset):
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                break
+            yield from serializer.to_representation(chunk)
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().retrieve(request, *args, **kwargs)
+        # Права на объект проверяются по строке values_list, а не по
+        # экземпляру модели: has_object_permission должна разрешать
+        # безопасные методы, не обращаясь к атрибутам объекта
+        serializer = self.fast_serializer_class()
+        queryset = serializer.prepare(
+            self.filter_queryset(self.get_queryset())
+        )
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+        return Response(serializer.to_representation([row])[0])
+
+
+class CachedListMixin:
+    """
+    Список из кэша ответов.
+
+    Кэш сбрасывается при любом изменении модели, см. api.cache.
+    С кэшем в памяти процесса ответы не кэшируются.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not is_shared_cache(settings.RESPONSE_CACHE_ALIAS):
+            return super().list(request, *args, **kwargs)
+        cache = get_cache()
+        key = get_response_cache_key(self.queryset.model, request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
 
 
 class GetListCreateDeleteViewSet(
+        ConditionalListMixin,
+        CachedListMixin,
         mixins.ListModelMixin,
         mixins.CreateModelMixin,
         mixins.DestroyModelMixin,
@@ -12,7 +167,20 @@ class GetListCreateDeleteViewSet(
 ):
     """ViewSet для методов Get, List, Create, Delete."""
 
-    filter_backends = (SearchFilter,)
+    filter_backends = (RelevanceSearchFilter,)
     search_fields = ("name",)
     lookup_field = "slug"
     permission_classes = (IsAdminOrReadOnly,)
+
+
+class AuthorCreateMixin:
+    """Сохранение объекта с автором - текущим пользователем."""
+
+    def save_with_author(self, serializer, **kwargs):
+        user = self.request.user
+        if isinstance(user, User):
+            kwargs["author"] = user
+        else:
+            # Пользователь из токена - не загружаем его строку из БД
+            kwargs["author_id"] = user.pk
+        serializer.save(**kwargs)
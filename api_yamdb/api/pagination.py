@@ -0,0 +1,159 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_MODE = "cursor"
+UNPAGINATED_MODE = "none"
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с опциональным режимом курсора (keyset).
+
+    Режим курсора включается параметром ?pagination=cursor,
+    заголовком X-Pagination: cursor или наличием параметра ?cursor=.
+    Курсор хранит значения полей сортировки последнего объекта страницы,
+    поэтому выборка любой страницы стоит столько же, сколько первой,
+    и не требует COUNT(*). Поля сортировки задаются атрибутом
+    cursor_ordering представления; последним должно идти уникальное поле.
+
+    Администратор может отключить пагинацию параметром ?pagination=none,
+    тогда представление отдаёт весь список потоком.
+    """
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    mode_header = "X-Pagination"
+    invalid_cursor_message = "Неверный курсор."
+
+    def use_cursor(self, request):
+        """Определяем, запрошен ли режим курсора."""
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == CURSOR_MODE
+            or request.headers.get(self.mode_header) == CURSOR_MODE
+        )
+
+    def unpaginated(self, request):
+        """Определяем, запросил ли администратор весь список."""
+        return (
+            request.query_params.get(self.mode_query_param)
+            == UNPAGINATED_MODE
+            and getattr(request.user, "is_admin", False)
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.unpaginated(request):
+            return None
+        self.keyset = self.use_cursor(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = tuple(
+            (field.lstrip("-"), field.startswith("-"))
+            for field in view.cursor_ordering
+        )
+        position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple((name, not desc) for name, desc in ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        queryset = queryset.order_by(*(
+            f"-{name}" if desc else name for name, desc in ordering
+        ))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            if has_more or self.reverse:
+                self.next_position = self.get_position(results[-1])
+            if position is not None and (has_more or not self.reverse):
+                self.previous_position = self.get_position(results[0])
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict((
+            ("next", self.get_cursor_link(self.next_position, False)),
+            ("previous", self.get_cursor_link(self.previous_position, True)),
+            ("results", data),
+        )))
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        """Строим условие «строго после позиции» для составного ключа."""
+        condition = Q()
+        for idx, (name, desc) in enumerate(ordering):
+            lookup = {f"{name}__{'lt' if desc else 'gt'}": position[idx]}
+            equal = {
+                prev_name: position[prev_idx]
+                for prev_idx, (prev_name, _) in enumerate(ordering[:idx])
+            }
+            condition |= Q(**equal, **lookup)
+        return condition
+
+    def get_position(self, obj):
+        position = []
+        for name, _ in self.ordering:
+            value = getattr(obj, name)
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            position, reverse = cursor["p"], bool(cursor["r"])
+        except (BinasciiError, KeyError, TypeError, UnicodeError,
+                ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+                len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return self.parse_position(position, model), reverse
+
+    def parse_position(self, position, model):
+        """Приводим значения курсора к типам полей сортировки."""
+        parsed = []
+        for (name, _), value in zip(self.ordering, position):
+            try:
+                value = model._meta.get_field(name).to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            parsed.append(value)
+        return parsed
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        encoded = urlsafe_b64encode(
+            json.dumps({"p": position, "r": int(reverse)}).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(url, self.cursor_query_param, encoded)
@@ -27,9 +27,11 @@ class IsAdminModeratorAuthorReadOnly(permissions.IsAuthenticatedOrReadOnly):
     """Permissions for Admin, Moderator, Author or Reader."""
 
     def has_object_permission(self, request, view, obj):
+        # Сначала проверяем роль, автора сравниваем по author_id,
+        # чтобы не загружать связанного пользователя
         return (
             request.method in permissions.SAFE_METHODS
             or request.user.is_admin
             or request.user.is_moderator
-            or obj.author == request.user
+            or obj.author_id == request.user.pk
         )
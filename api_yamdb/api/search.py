@@ -0,0 +1,139 @@
+"""
+Поиск по названиям с ранжированием по релевантности.
+
+Бэкенд выбирается настройкой SEARCH_BACKEND. По умолчанию он
+определяется по СУБД: PostgreSQL - полнотекстовый поиск и триграммы,
+SQLite - FTS5, остальные - поиск по вхождению подстроки.
+Все бэкенды добавляют к queryset аннотацию search_rank.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# Полнотекстовые таблицы SQLite FTS5, которые ведут триггеры миграций
+FTS_TABLES = {
+    "reviews_title": "reviews_title_fts",
+}
+
+SEARCH_RANK = "search_rank"
+
+
+def get_search_terms(query):
+    """Разбиваем строку поиска на слова."""
+    return re.findall(r"\w+", query)
+
+
+class BaseSearchBackend:
+    """Бэкенд поиска по вхождению подстроки в любое из полей."""
+
+    def search(self, queryset, fields, query):
+        terms = get_search_terms(query)
+        if not terms:
+            return queryset.none()
+        condition = Q()
+        for term in terms:
+            term_condition = Q()
+            for field in fields:
+                term_condition |= Q(**{f"{field}__icontains": term})
+            condition &= term_condition
+        return queryset.filter(condition).annotate(
+            **{SEARCH_RANK: Value(0.0, output_field=FloatField())}
+        )
+
+    @staticmethod
+    def column(queryset, field):
+        model = queryset.model
+        quote_name = connection.ops.quote_name
+        return "{}.{}".format(
+            quote_name(model._meta.db_table),
+            quote_name(model._meta.get_field(field).column),
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Полнотекстовый поиск PostgreSQL с допуском опечаток по триграммам.
+
+    Документ строится тем же выражением, что и GIN-индекс из миграции
+    reviews.0007, поэтому поиск по произведениям использует индекс.
+    """
+
+    config = "simple"
+
+    def document(self, queryset, fields):
+        return "to_tsvector('{}'::regconfig, {})".format(
+            self.config,
+            " || ' ' || ".join(
+                f"COALESCE({self.column(queryset, field)}, '')"
+                for field in fields
+            ),
+        )
+
+    def search(self, queryset, fields, query):
+        terms = get_search_terms(query)
+        if not terms:
+            return queryset.none()
+        document = self.document(queryset, fields)
+        tsquery = f"to_tsquery('{self.config}'::regconfig, %s)"
+        trigram = f"UPPER({self.column(queryset, fields[0])}::text)"
+        prefix_query = " & ".join(f"{term}:*" for term in terms)
+        return queryset.filter(RawSQL(
+            f"({document} @@ {tsquery} OR {trigram} %% UPPER(%s))",
+            (prefix_query, query),
+            output_field=BooleanField(),
+        )).annotate(**{SEARCH_RANK: RawSQL(
+            f"ts_rank({document}, {tsquery}) "
+            f"+ similarity({trigram}, UPPER(%s))",
+            (prefix_query, query),
+            output_field=FloatField(),
+        )})
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """Поиск SQLite FTS5 для таблиц из FTS_TABLES."""
+
+    def search(self, queryset, fields, query):
+        fts_table = FTS_TABLES.get(queryset.model._meta.db_table)
+        if fts_table is None:
+            return super().search(queryset, fields, query)
+        terms = get_search_terms(query)
+        if not terms:
+            return queryset.none()
+        match = " ".join(f'"{term}"*' for term in terms)
+        pk = self.column(queryset, queryset.model._meta.pk.name)
+        return queryset.filter(RawSQL(
+            f"{pk} IN (SELECT rowid FROM {fts_table} "
+            f"WHERE {fts_table} MATCH %s)",
+            (match,),
+            output_field=BooleanField(),
+        )).annotate(**{SEARCH_RANK: RawSQL(
+            f"(SELECT -bm25({fts_table}) FROM {fts_table} "
+            f"WHERE {fts_table} MATCH %s AND rowid = {pk})",
+            (match,),
+            output_field=FloatField(),
+        )})
+
+
+BACKENDS_BY_VENDOR = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """Возвращаем бэкенд из настройки SEARCH_BACKEND или по СУБД."""
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)()
+    return BACKENDS_BY_VENDOR.get(connection.vendor, BaseSearchBackend)()
+
+
+def search(queryset, fields, query):
+    """Ищем по полям и упорядочиваем результаты по релевантности."""
+    return get_search_backend().search(queryset, fields, query).order_by(
+        f"-{SEARCH_RANK}", *queryset.query.order_by
+    )
@@ -1,11 +1,19 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from rest_framework.relations import SlugRelatedField
-
-from api.user_auth_utils import create_confirmation_code
+from rest_framework.relations import MANY_RELATION_KWARGS, SlugRelatedField
+from rest_framework.settings import api_settings
+
+from api.cache import slug_cache
+from api.user_auth_utils import (check_signed_confirmation_code,
+                                 create_confirmation_code,
+                                 make_signed_confirmation_code,
+                                 send_confirmation_code)
+from reviews.constants import SCORES, SLUG_MAX_LENGTH
 from reviews.models import Category, Comment, Genre, Review, Title
 from users.constants import USERNAME_MAX_LENGTH, Roles
 from users.validators import username_validator
@@ -29,11 +37,16 @@ class UserAuthSerializer(serializers.Serializer):
         username = data.get("username")
         email = data.get("email")
 
-        # Проверяем существование пользователя с таким username
-        user_by_username = User.objects.filter(username=username).first()
-
-        # Проверяем существование пользователя с таким email
-        user_by_email = User.objects.filter(email=email).first()
+        # Ищем пользователей с таким username или email одним запросом
+        users = User.objects.filter(
+            Q(username=username) | Q(email=email)
+        ).only("id", "username", "email", "confirmation_code")[:2]
+        user_by_username = user_by_email = None
+        for user in users:
+            if user.username == username:
+                user_by_username = user
+            if user.email == email:
+                user_by_email = user
 
         errors = {}
         if user_by_username:
@@ -51,21 +64,36 @@ class UserAuthSerializer(serializers.Serializer):
         if errors:
             raise ValidationError(errors)
 
+        self.existing_user = user_by_username
         return data
 
     def create(self, validated_data):
         confirmation_code = create_confirmation_code()
-        user, created = User.objects.get_or_create(**validated_data)
-        user.confirmation_code = confirmation_code
-        user.save()
-
-        send_mail(
-            subject="Регистрация в YaMDB",
-            message=f"Код подтверждения: {confirmation_code}",
-            from_email="from@example.com",
-            recipient_list=(user.email,),
-            fail_silently=True,
-        )
+        user = getattr(self, "existing_user", None)
+        if user is None:
+            try:
+                with transaction.atomic():
+                    user = User.objects.create(
+                        confirmation_code=confirmation_code,
+                        **validated_data
+                    )
+            except IntegrityError:
+                # Пользователь зарегистрировался параллельным запросом
+                user = User.objects.filter(**validated_data).only(
+                    "id", "username", "email", "confirmation_code"
+                ).first()
+                if user is None:
+                    raise serializers.ValidationError(
+                        "Пользователь с таким username или email "
+                        "уже существует."
+                    )
+        if settings.SIGNED_CONFIRMATION_CODES:
+            # В БД хранится только nonce, код вычисляется без записи
+            confirmation_code = make_signed_confirmation_code(user)
+        elif user.confirmation_code != confirmation_code:
+            user.confirmation_code = confirmation_code
+            user.save(update_fields=("confirmation_code",))
+        send_confirmation_code(user, confirmation_code)
         return user
 
 
@@ -80,8 +108,16 @@ class GetTokenSerializer(serializers.Serializer):
 
     def validate(self, data):
         user = get_object_or_404(User, username=data["username"])
-        if user.confirmation_code != data["confirmation_code"]:
+        if settings.SIGNED_CONFIRMATION_CODES:
+            valid = check_signed_confirmation_code(
+                user, data["confirmation_code"]
+            )
+        else:
+            valid = user.confirmation_code == data["confirmation_code"]
+        if not valid:
             raise serializers.ValidationError("Переданы неверные данные")
+        # Передаём найденного пользователя в представление
+        data["user"] = user
         return data
 
 
@@ -125,8 +161,48 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = "slug"
 
 
+class ManyDictSlugRelatedField(serializers.ManyRelatedField):
+    """Список слагов, разрешаемый одним запросом к БД."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        return self.child_relation.to_internal_value_many(data)
+
+
 class DictSlugRelatedField(SlugRelatedField):
-    """Способ отображения для Жанра и Категории в Произведении."""
+    """
+    Способ отображения для Жанра и Категории в Произведении.
+
+    Объекты по слагам берутся из кэша процесса api.cache.slug_cache.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManyDictSlugRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        return self.to_internal_value_many([data])[0]
+
+    def to_internal_value_many(self, data):
+        if not all(isinstance(slug, (str, int)) for slug in data):
+            self.fail("invalid")
+        slugs = [str(slug) for slug in data]
+        objects = slug_cache.get_many(
+            self.get_queryset(), self.slug_field, slugs
+        )
+        for slug in slugs:
+            if slug not in objects:
+                self.fail(
+                    "does_not_exist", slug_name=self.slug_field, value=slug
+                )
+        return [objects[slug] for slug in slugs]
 
     def to_representation(self, obj):
         result = {"name": obj.name, "slug": obj.slug}
@@ -163,6 +239,76 @@ class TitleSerializer(serializers.ModelSerializer):
             )
         return value
 
+    def save(self, **kwargs):
+        # Жанр или категорию из кэша слагов могли удалить в другом процессе,
+        # ограничение внешнего ключа проверяется при фиксации транзакции
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            slug_cache.clear()
+            raise serializers.ValidationError(
+                "Жанр или категория не найдены."
+            )
+
+
+class TitleBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Элемент массовой загрузки произведений.
+
+    Жанры и категория принимаются слагами и проверяются без запросов
+    к БД: слаги всех элементов разрешаются разом в api.bulk.
+    Элемент с id обновляет существующее произведение.
+    """
+
+    id = serializers.IntegerField(required=False)
+    category = serializers.SlugField(max_length=SLUG_MAX_LENGTH)
+    genre = serializers.ListField(
+        child=serializers.SlugField(max_length=SLUG_MAX_LENGTH),
+        allow_empty=False,
+    )
+
+    class Meta:
+        model = Title
+        fields = ("id", "name", "year", "description", "genre", "category")
+
+
+class TitleStatsSerializer(serializers.BaseSerializer):
+    """
+    Статистика оценок произведения.
+
+    Принимает гистограмму - словарь {оценка: число отзывов}.
+    """
+
+    def to_representation(self, histogram):
+        counts = {score: histogram.get(score) or 0 for score in SCORES}
+        review_count = sum(counts.values())
+        mean = median = None
+        if review_count:
+            mean = sum(
+                score * count for score, count in counts.items()
+            ) / review_count
+            median = self.get_median(counts, review_count)
+        return {
+            "review_count": review_count,
+            "mean": mean,
+            "median": median,
+            "scores": {str(score): count for score, count in counts.items()},
+        }
+
+    @staticmethod
+    def get_median(counts, review_count):
+        """Медиана по гистограмме: среднее двух центральных оценок."""
+        middle = ((review_count - 1) // 2, review_count // 2)
+        values = []
+        seen = 0
+        for score, count in counts.items():
+            values.extend(
+                score for position in middle if seen <= position < seen + count
+            )
+            seen += count
+        return sum(values) / len(values)
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     """Отзывы serializers."""
@@ -172,18 +318,23 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only=True,
     )
 
-    def validate(self, data):
-        if self.context.get("request").method == "POST":
-            author = self.context.get("request").user
-            title_id = self.context.get("view").kwargs.get("title_id")
-            if Review.objects.filter(
-                    author=author,
-                    title__id=title_id
+    def create(self, validated_data):
+        # Уникальность пары автор-произведение проверяет ограничение БД:
+        # без предварительного запроса и без гонки между проверкой и вставкой
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            author = validated_data.get("author")
+            if not Review.objects.filter(
+                author_id=author.pk if author else validated_data["author_id"],
+                title_id=validated_data["title_id"],
             ).exists():
-                raise serializers.ValidationError(
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
                     "Можно написать только один обзор к произведению"
-                )
-        return data
+                ]
+            })
 
     class Meta:
         model = Review
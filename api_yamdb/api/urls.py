@@ -1,9 +1,9 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from api.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                       ReviewViewSet, TitleViewSet, UsersViewSet, get_token,
-                       user_signup)
+from api.views import (CategoryViewSet, CommentViewSet, ExportView,
+                       GenreViewSet, ReviewViewSet, TitleViewSet, UsersViewSet,
+                       get_token, user_signup)
 
 app_name = "api"
 
@@ -26,6 +26,7 @@ router_v1.register("users", UsersViewSet, basename="users")
 urlpatterns = [
     path("v1/auth/signup/", user_signup, name="user_signup"),
     path("v1/auth/token/", get_token, name="get_token"),
+    path("v1/export/<str:dataset>/", ExportView.as_view(), name="export"),
     # path(
     #     "v1/users/me/",
     #     MeUserViewSet.as_view(
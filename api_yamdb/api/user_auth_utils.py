@@ -1,23 +1,164 @@
 import random
 import string
+import time
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.mail import send_mail
+from django.db.models import F
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import base36_to_int, int_to_base36
 from rest_framework_simplejwt.tokens import AccessToken
 
-from users.constants import CONFIRMATION_CODE_LENGTH
+from users.constants import (CONFIRMATION_CODE_LENGTH, TOKEN_STATE_CACHE_KEY,
+                             TOKEN_USER_CLAIMS, TOKEN_VERSION_CLAIM)
+from users.outbox import queue_email
+
+SIGNED_CODE_KEY_SALT = "api.user_auth_utils.signed_confirmation_code"
 
 
 def get_tokens_for_user(user):
-    """Получаем токен для пользователя."""
+    """
+    Получаем токен для пользователя.
+
+    В токен добавляются роль и флаги пользователя, чтобы
+    ClaimsJWTAuthentication не загружала пользователя, и версия токенов
+    пользователя для их отзыва. Состояние токенов сразу кладётся в кэш,
+    чтобы запросы с новым токеном не обращались к таблице пользователей.
+    """
     access = AccessToken.for_user(user)
+    for claim in TOKEN_USER_CLAIMS:
+        access[claim] = getattr(user, claim)
+    access[TOKEN_VERSION_CLAIM] = user.token_version
+    cache = get_token_state_cache()
+    if cache is not None:
+        cache.set(
+            TOKEN_STATE_CACHE_KEY.format(user.pk),
+            (user.token_version, user.is_active),
+            settings.TOKEN_STATE_CACHE_TIMEOUT,
+        )
 
     return {
         "token": str(access)
     }
 
 
+def get_token_state_cache():
+    alias = settings.TOKEN_STATE_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def get_token_state(user_id):
+    """
+    Версия токенов и флаг is_active пользователя, None - нет пользователя.
+
+    Источник истины - строка пользователя в БД. Если задан
+    TOKEN_STATE_CACHE_ALIAS, состояние кэшируется на
+    TOKEN_STATE_CACHE_TIMEOUT секунд; при отсутствии записи в кэше
+    состояние читается из БД.
+    """
+    cache = get_token_state_cache()
+    key = TOKEN_STATE_CACHE_KEY.format(user_id)
+    state = cache.get(key) if cache is not None else None
+    if state is None:
+        state = get_user_model().objects.filter(pk=user_id).values_list(
+            "token_version", "is_active"
+        ).first()
+        if state is not None and cache is not None:
+            cache.set(key, state, settings.TOKEN_STATE_CACHE_TIMEOUT)
+    return state
+
+
+def revoke_user_tokens(user):
+    """
+    Отзываем выданные пользователю токены.
+
+    Вызывается при изменении роли или флагов пользователя: токены,
+    выданные до этого момента, содержат устаревшие утверждения.
+    """
+    get_user_model().objects.filter(pk=user.pk).update(
+        token_version=F("token_version") + 1
+    )
+    user.refresh_from_db(fields=("token_version",))
+    forget_token_state(type(user), user)
+
+
+def forget_token_state(sender, instance, **kwargs):
+    """
+    Удаляем состояние токенов пользователя из кэша.
+
+    Обработчик post_save и post_delete пользователя: изменение is_active,
+    в том числе через админку, применяется сразу.
+    """
+    cache = get_token_state_cache()
+    if cache is not None:
+        cache.delete(TOKEN_STATE_CACHE_KEY.format(instance.pk))
+
+
 def create_confirmation_code(
     size=CONFIRMATION_CODE_LENGTH,
     chars=string.ascii_uppercase + string.digits
 ):
     """Генерируем код подтверждения."""
     return "".join(random.choice(chars) for _ in range(size))
+
+
+def make_signed_confirmation_code(user, timestamp=None):
+    """
+    Подписываем код подтверждения вместо хранения его в БД.
+
+    Код - это метка времени и HMAC от id, email и nonce пользователя.
+    В поле confirmation_code хранится nonce: после выдачи токена он
+    меняется, и все выданные ранее коды становятся недействительными.
+    """
+    if timestamp is None:
+        timestamp = int(time.time())
+    signature = salted_hmac(
+        SIGNED_CODE_KEY_SALT,
+        f"{user.pk}{user.email}{user.confirmation_code}{timestamp}",
+        algorithm="sha256",
+    ).hexdigest()[::2]
+    return f"{int_to_base36(timestamp)}-{signature}"
+
+
+def check_signed_confirmation_code(user, confirmation_code):
+    """Проверяем подпись и срок действия кода подтверждения."""
+    try:
+        timestamp, _ = confirmation_code.split("-")
+        timestamp = base36_to_int(timestamp)
+    except ValueError:
+        return False
+    if time.time() - timestamp > settings.CONFIRMATION_CODE_TIMEOUT:
+        return False
+    return constant_time_compare(
+        make_signed_confirmation_code(user, timestamp), confirmation_code
+    )
+
+
+def rotate_confirmation_nonce(user):
+    """Делаем недействительными все подписанные коды пользователя."""
+    user.confirmation_code = create_confirmation_code()
+    user.save(update_fields=("confirmation_code",))
+
+
+def send_confirmation_code(user, confirmation_code):
+    """
+    Отправляем код подтверждения пользователю.
+
+    При включённой настройке EMAIL_OUTBOX_ENABLED письмо ставится
+    в очередь и отправляется командой send_emails.
+    """
+    email = {
+        "subject": "Регистрация в YaMDB",
+        "message": f"Код подтверждения: {confirmation_code}",
+        "from_email": "from@example.com",
+    }
+    if settings.EMAIL_OUTBOX_ENABLED:
+        queue_email(recipient=user.email, **email)
+        return
+    send_mail(
+        recipient_list=(user.email,),
+        fail_silently=True,
+        **email,
+    )
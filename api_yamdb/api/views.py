@@ -1,24 +1,42 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django_filters.rest_framework.backends import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.bulk import bulk_save_titles
+from api.export import EXPORTS
+from api.fast_serializers import (CommentValuesSerializer,
+                                  ReviewValuesSerializer,
+                                  TitleValuesSerializer)
 from api.filters import TitleFilter
-from api.mixins import GetListCreateDeleteViewSet
+from api.mixins import (AuthorCreateMixin, ConditionalGetMixin, FastReadMixin,
+                        GetListCreateDeleteViewSet)
+from api.pagination import PageNumberOrKeysetPagination
+from api.parsers import NDJSONParser
 from api.permissions import (IsAdminModeratorAuthorReadOnly, IsAdminOrReadOnly,
                              IsSuperUserOrIsAdmin)
+from api.renderers import CSVRenderer, NDJSONRenderer
 from api.serializers import (CategorySerializer, CommentSerializer,
                              GenreSerializer, GetTokenSerializer,
                              MeUserSerializer, ReviewSerializer,
-                             TitleSerializer, UserAuthSerializer,
-                             UserSerializer)
-from api.user_auth_utils import get_tokens_for_user
-from reviews.models import Category, Genre, Review, Title
+                             TitleSerializer, TitleStatsSerializer,
+                             UserAuthSerializer, UserSerializer)
+from api.user_auth_utils import (get_tokens_for_user, revoke_user_tokens,
+                                 rotate_confirmation_nonce)
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title)
+from users.constants import TOKEN_USER_CLAIMS
 
 User = get_user_model()
 
@@ -40,11 +58,10 @@ def get_token(request):
     """Представление для получения токена."""
     serializer = GetTokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    user = get_object_or_404(
-        User,
-        username=serializer.validated_data["username"]
-    )
+    user = serializer.validated_data["user"]
     token = get_tokens_for_user(user)
+    if settings.SIGNED_CONFIRMATION_CODES:
+        rotate_confirmation_nonce(user)
     return Response(token, status=status.HTTP_200_OK)
 
 
@@ -71,6 +88,19 @@ class UsersViewSet(viewsets.ModelViewSet):
             return MeUserSerializer
         return super().get_serializer_class()
 
+    def perform_update(self, serializer):
+        old_claims = [getattr(serializer.instance, claim)
+                      for claim in TOKEN_USER_CLAIMS]
+        user = serializer.save()
+        # Утверждения в выданных токенах устарели - отзываем их
+        if old_claims != [getattr(user, claim)
+                          for claim in TOKEN_USER_CLAIMS]:
+            revoke_user_tokens(user)
+
+    def perform_destroy(self, instance):
+        revoke_user_tokens(instance)
+        instance.delete()
+
     @action(
         detail=False,
         methods=("get", "patch"),
@@ -81,6 +111,9 @@ class UsersViewSet(viewsets.ModelViewSet):
         Метод для просмотра и редактирования пользователем информации о себе.
         """
         user = self.request.user
+        if not isinstance(user, User):
+            # Пользователь из токена не содержит данных профиля
+            user = get_object_or_404(User, pk=user.pk)
         serializer = self.get_serializer(user)
         if request.method == "PATCH":
             serializer = self.get_serializer(
@@ -97,6 +130,7 @@ class CategoryViewSet(GetListCreateDeleteViewSet):
 
     queryset = Category.objects.all().order_by("name")
     serializer_class = CategorySerializer
+    cache_dependencies = (Category,)
 
 
 class GenreViewSet(GetListCreateDeleteViewSet):
@@ -104,58 +138,141 @@ class GenreViewSet(GetListCreateDeleteViewSet):
 
     queryset = Genre.objects.all().order_by("name")
     serializer_class = GenreSerializer
+    cache_dependencies = (Genre,)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalGetMixin, FastReadMixin,
+                   viewsets.ModelViewSet):
     """Получение списка всех произведений."""
 
-    queryset = Title.objects.all().annotate(
-        rating=Avg("reviews__score")
+    queryset = Title.objects.select_related("category").prefetch_related(
+        Prefetch(
+            "genre",
+            queryset=Genre.objects.only("name", "slug").order_by("slug")
+        )
     ).order_by("-year")
     serializer_class = TitleSerializer
+    fast_serializer_class = TitleValuesSerializer
     permission_classes = (IsAdminOrReadOnly,)
+    pagination_class = PageNumberOrKeysetPagination
+    cursor_ordering = ("-year", "id")
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     http_method_names = ("get", "post", "patch", "delete")
+    lookup_value_regex = r"\d+"
+    # Рейтинг произведения меняется вместе с отзывами
+    cache_dependencies = (Category, Genre, GenreTitle, Review, Title)
+
+    @action(detail=True, methods=("get",))
+    def stats(self, request, pk=None):
+        """Распределение оценок произведения одним запросом к БД."""
+        histogram = dict(Title.objects.filter(pk=pk).values_list(
+            "score_counts__score", "score_counts__count"
+        ))
+        if not histogram:
+            raise Http404
+        return Response(TitleStatsSerializer(histogram).data)
+
+    @action(
+        detail=False,
+        methods=("post",),
+        parser_classes=(JSONParser, NDJSONParser),
+    )
+    def bulk(self, request):
+        """Массовое создание и обновление: JSON-массив или NDJSON."""
+        if not isinstance(request.data, list):
+            raise ValidationError(
+                "Ожидается JSON-массив или NDJSON с произведениями."
+            )
+        return Response(bulk_save_titles(request.data))
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, FastReadMixin, AuthorCreateMixin,
+                    viewsets.ModelViewSet):
     """Обзоры viewset."""
 
     serializer_class = ReviewSerializer
+    fast_serializer_class = ReviewValuesSerializer
     permission_classes = (IsAdminModeratorAuthorReadOnly,)
+    pagination_class = PageNumberOrKeysetPagination
+    cursor_ordering = ("pub_date", "id")
     http_method_names = ("get", "post", "patch", "delete")
+    cache_dependencies = (Review, Title, User)
 
-    def get_title(self):
-        """Получаем соответствующий Title."""
-        return get_object_or_404(
-            Title,
-            id=self.kwargs.get("title_id")
-        )
+    @cached_property
+    def title_id(self):
+        """Проверяем существование Title один раз за запрос."""
+        title_id = self.kwargs.get("title_id")
+        if not Title.objects.filter(id=title_id).exists():
+            raise Http404
+        return title_id
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return Review.objects.filter(title_id=self.title_id).select_related(
+            "author"
+        ).only(
+            "id", "text", "score", "pub_date", "edited_date", "title",
+            "author__username"
+        )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        self.save_with_author(serializer, title_id=self.title_id)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, FastReadMixin, AuthorCreateMixin,
+                     viewsets.ModelViewSet):
     """Комментарии viewset."""
 
     serializer_class = CommentSerializer
+    fast_serializer_class = CommentValuesSerializer
     permission_classes = (IsAdminModeratorAuthorReadOnly,)
+    pagination_class = PageNumberOrKeysetPagination
+    cursor_ordering = ("pub_date", "id")
     http_method_names = ("get", "post", "patch", "delete")
-
-    def get_review(self):
-        return get_object_or_404(
-            Review,
-            id=self.kwargs.get("review_id"),
-            title=self.kwargs.get("title_id")
-        )
+    cache_dependencies = (Comment, Review, User)
+
+    @cached_property
+    def review_id(self):
+        """Проверяем существование Review один раз за запрос."""
+        review_id = self.kwargs.get("review_id")
+        if not Review.objects.filter(
+            id=review_id,
+            title_id=self.kwargs.get("title_id")
+        ).exists():
+            raise Http404
+        return review_id
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return Comment.objects.filter(
+            review_id=self.review_id
+        ).select_related("author").only(
+            "id", "text", "pub_date", "edited_date", "review",
+            "author__username"
+        )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+        self.save_with_author(serializer, review_id=self.review_id)
+
+
+class ExportView(APIView):
+    """Потоковая выгрузка произведений, отзывов и комментариев."""
+
+    permission_classes = (IsSuperUserOrIsAdmin,)
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    def get(self, request, dataset):
+        export = EXPORTS.get(dataset)
+        if export is None:
+            raise NotFound(f"Неизвестный набор данных: {dataset}")
+        renderer = request.accepted_renderer
+        if renderer.format == CSVRenderer.format:
+            content = export.csv_lines()
+            content_type = f"{renderer.media_type}; charset=utf-8"
+        else:
+            content = renderer.render_lines(export.ndjson_items())
+            content_type = renderer.media_type
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="{dataset}.{renderer.format}"'
+        )
+        return response
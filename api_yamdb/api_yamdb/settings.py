@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -85,10 +86,67 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Время жизни соединения в секундах, 0 - новое на каждый запрос
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # Пулер в режиме transaction (PgBouncer) не поддерживает
+        # серверные курсоры, которые использует .iterator()
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True'
+        ),
     }
 }
 
+# Проверять постоянное соединение в начале запроса (см. api.db)
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+
+# Cache
+# default - кэш в памяти процесса. shared - кэш, общий для всех
+# процессов gunicorn: в нём хранятся версии данных для ETag и кэша
+# ответов и состояние токенов. По умолчанию shared - файловый кэш,
+# общий для процессов одного сервера; для нескольких серверов укажите
+# SHARED_CACHE_BACKEND, например
+# django.core.cache.backends.memcached.PyMemcacheCache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+    'shared': {
+        'BACKEND': os.getenv(
+            'SHARED_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'SHARED_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'api_yamdb_cache')
+        ),
+    },
+}
+
+if CACHES['shared']['BACKEND'].endswith('.FileBasedCache'):
+    CACHES['shared']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('SHARED_CACHE_MAX_ENTRIES', 10000)),
+    }
+
+# Кэш ответов со списками и версии данных для условных GET-запросов.
+# С кэшем в памяти процесса они отключаются: изменения из других
+# процессов были бы не видны (см. api.checks)
+
+RESPONSE_CACHE_ALIAS = os.getenv('RESPONSE_CACHE_ALIAS', 'shared')
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+
+# Search
+# Путь к классу бэкенда поиска, по умолчанию выбирается по СУБД
+
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', '')
+
 
 # Password validation
 
@@ -132,9 +190,13 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'PAGE_SIZE': 5,
 }
 
@@ -144,4 +206,27 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = 'users.YamdbUser'
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Кэш версий токенов пользователей. Должен быть общим для всех процессов;
+# пустое значение отключает кэш, тогда версия читается из БД
+TOKEN_STATE_CACHE_ALIAS = (
+    os.getenv('TOKEN_STATE_CACHE_ALIAS', 'shared') or None
+)
+
+TOKEN_STATE_CACHE_TIMEOUT = int(os.getenv('TOKEN_STATE_CACHE_TIMEOUT', 300))
+
+# Коды подтверждения подписываются HMAC и не хранятся в БД
+SIGNED_CONFIRMATION_CODES = (
+    os.getenv('SIGNED_CONFIRMATION_CODES', 'False') == 'True'
+)
+# Срок действия подписанного кода подтверждения, секунды
+CONFIRMATION_CODE_TIMEOUT = int(
+    os.getenv('CONFIRMATION_CODE_TIMEOUT', 24 * 60 * 60)
+)
+
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend'
+)
+
+# Письма с кодом подтверждения ставятся в очередь
+# и отправляются командой send_emails
+EMAIL_OUTBOX_ENABLED = os.getenv('EMAIL_OUTBOX_ENABLED', 'False') == 'True'
@@ -33,6 +33,8 @@ class TitleAdmin(admin.ModelAdmin):
         "name",
         "category",
         "year",
+        "rating",
+        "review_count",
     )
     search_fields = ("name",)
     list_filter = ("category",)
@@ -11,3 +11,7 @@ SLUG_MAX_LENGTH = 50
 SCORE_MAX_VALUE = 10
 
 SCORE_MIN_VALUE = 1
+
+SCORES = range(SCORE_MIN_VALUE, SCORE_MAX_VALUE + 1)
+
+TITLE_SCORE_BATCH_SIZE = 5000
@@ -1,10 +1,21 @@
 import csv
+import io
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
 
 from django.apps import apps
-from django.core.management.base import BaseCommand
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
 
+from api.cache import bump_cache_version
+from reviews.models import Review, Title, TitleScore
 
-triples = [
+DEFAULT_DATASETS = (
     "users:YamdbUser:static/data/users.csv",
     "reviews:Category:static/data/category.csv",
     "reviews:Genre:static/data/genre.csv",
@@ -12,34 +23,425 @@ triples = [
     "reviews:GenreTitle:static/data/genre_title.csv",
     "reviews:Review:static/data/review.csv",
     "reviews:Comment:static/data/comments.csv",
-]
+)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Файлы больше этого размера в параллельном режиме делятся на части
+SPLIT_MIN_FILE_SIZE = 10 * 1024 * 1024
+
+COPY_NULL = r"\N"
 
 
 class Command(BaseCommand):
-    help = ('Загрузка данных из csv-файлов в модели. ',
-            'Пример команды: python manage.py import_data ',
-            '"Model1:path/to/file1.csv" "Model2:path/to/file2.csv"')
+    help = ("Загрузка данных из csv-файлов в модели. "
+            "Пример команды: python manage.py import_data "
+            '"app:Model1:path/to/file1.csv" "app:Model2:path/to/file2.csv"')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "datasets",
+            nargs="*",
+            default=DEFAULT_DATASETS,
+            help="Наборы данных в формате app:Model:path/to/file.csv",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Количество строк, вставляемых за один запрос",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже при работе с PostgreSQL",
+        )
+        parser.add_argument(
+            "--parallel",
+            type=int,
+            default=0,
+            metavar="WORKERS",
+            help="Загружать независимые наборы данных параллельно",
+        )
+        parser.add_argument(
+            "--split",
+            type=int,
+            default=1,
+            metavar="PARTS",
+            help=("Сколько потоков записывают порции строк крупного "
+                  "файла в параллельном режиме"),
+        )
 
     def handle(self, *args, **options):
-        for triple in triples:
-            parts = triple.split(':')
-            if len(parts) == 3:
-                app_name, model_name, csv_file_path = parts
+        if options["chunk_size"] < 1 or options["split"] < 1:
+            raise CommandError(
+                "--chunk-size и --split должны быть положительными"
+            )
+        use_copy = (
+            connection.vendor == "postgresql" and not options["no_copy"]
+        )
+        datasets = self.parse_datasets(options["datasets"])
+        with self.keep_file_dates(datasets):
+            if options["parallel"] > 0:
+                self.import_parallel(
+                    datasets, options["parallel"], options["split"],
+                    options["chunk_size"], use_copy
+                )
+                return
+            for model, csv_file_path in datasets:
+                self.import_data(
+                    model, csv_file_path, options["chunk_size"], use_copy
+                )
+
+    @staticmethod
+    @contextmanager
+    def keep_file_dates(datasets):
+        """
+        Отключаем auto_now и auto_now_add у полей, которые есть в файлах.
+
+        Иначе bulk_create и COPY заменяют даты из файла текущим временем.
+        """
+        changed = []
+        for model, csv_file_path in datasets:
+            with open(csv_file_path, newline="", encoding="utf-8") as csvfile:
+                header = next(csv.reader(csvfile), [])
+            for field in model._meta.concrete_fields:
+                auto = (getattr(field, "auto_now", False),
+                        getattr(field, "auto_now_add", False))
+                if any(auto) and (field.name in header
+                                  or field.attname in header):
+                    changed.append((field, auto))
+                    field.auto_now = field.auto_now_add = False
+        try:
+            yield
+        finally:
+            for field, (auto_now, auto_now_add) in changed:
+                field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+    def parse_datasets(self, datasets):
+        """Разбираем аргументы вида app:Model:path в пары (модель, путь)."""
+        result = []
+        for dataset in datasets:
+            parts = dataset.split(":", 2)
+            if len(parts) != 3:
+                raise CommandError(f"Неверный формат: '{dataset}'")
+            app_name, model_name, csv_file_path = parts
+            try:
                 model = apps.get_model(app_name, model_name)
-                self.import_data(model, csv_file_path)
+            except LookupError as error:
+                raise CommandError(error)
+            result.append((model, csv_file_path))
+        return result
+
+    def import_data(self, model, csv_file_path, chunk_size, use_copy,
+                    parts=1):
+        """
+        Загружаем один csv-файл порциями.
+
+        Файл читается один раз. При parts > 1 порции подряд идущих строк
+        записывают parts потоков, каждую порцию - в своей транзакции,
+        иначе весь файл загружается в одной транзакции.
+        """
+        label = model._meta.label
+        started = time.monotonic()
+        imported = 0
+        with open(csv_file_path, newline="", encoding="utf-8") as csvfile:
+            reader = csv.reader(csvfile)
+            fields = self.resolve_columns(model, next(reader))
+            chunks = self.read_chunks(model, fields, reader, chunk_size)
+            if parts > 1:
+                imported = self.write_parallel(
+                    model, fields, chunks, use_copy, parts, label, started
+                )
+                with transaction.atomic():
+                    self.finish_import(model)
             else:
-                self.stdout.write(
-                    self.style.ERROR(f"Неверный формат: '{triple}'")
+                with transaction.atomic():
+                    for chunk in chunks:
+                        imported += self.write_chunk(
+                            model, fields, chunk, use_copy
+                        )
+                        self.report(label, imported, started)
+                    self.finish_import(model)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: загружено {imported} строк "
+            f"за {time.monotonic() - started:.1f} с"
+        ))
+        return imported
+
+    def read_chunks(self, model, fields, rows, chunk_size):
+        """Строки файла порциями с проверкой колонок и первичного ключа."""
+        pk_positions = [idx for idx, field in enumerate(fields)
+                        if field.primary_key]
+        # Первая строка файла - заголовок
+        line = 1
+        for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+            for row in chunk:
+                line += 1
+                if len(row) != len(fields):
+                    raise CommandError(
+                        f"{model._meta.label}: строка {line}: ожидается "
+                        f"колонок {len(fields)}, получено {len(row)}"
+                    )
+                for idx in pk_positions:
+                    try:
+                        fields[idx].to_python(row[idx])
+                    except ValidationError:
+                        raise CommandError(
+                            f"{model._meta.label}: строка {line}: неверный "
+                            f"первичный ключ '{row[idx]}'"
+                        )
+            yield chunk
+
+    def write_chunk(self, model, fields, rows, use_copy):
+        objects = [self.build_object(model, fields, row) for row in rows]
+        if use_copy:
+            self.copy_objects(model, fields, objects)
+        else:
+            model.objects.bulk_create(objects)
+        return len(objects)
+
+    def write_parallel(self, model, fields, chunks, use_copy, parts, label,
+                       started):
+        """
+        Записываем порции пулом из parts потоков.
+
+        В очереди не больше двух порций на поток, поэтому расход памяти
+        не зависит от размера файла.
+        """
+        write_chunk = transaction.atomic(self.write_chunk)
+        imported = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=parts) as executor:
+            for chunk in chunks:
+                if len(running) >= 2 * parts:
+                    finished, running = wait(
+                        running, return_when=FIRST_COMPLETED
+                    )
+                    imported += sum(future.result() for future in finished)
+                    self.report(label, imported, started)
+                running.add(executor.submit(
+                    self.run_in_thread, write_chunk, model, fields, chunk,
+                    use_copy
+                ))
+            imported += sum(future.result() for future in running)
+        return imported
+
+    def finish_import(self, model):
+        """Шаги, которые выполняются один раз после загрузки модели."""
+        self.reset_sequences(model)
+        # bulk_create и COPY не вызывают сигналы, сбрасывающие кэш
+        bump_cache_version(model)
+        if model is Review:
+            # bulk_create и COPY не вызывают сигналы отзывов
+            Title.objects.all().recalculate_rating()
+            bump_cache_version(Title)
+        if model in (Review, Title):
+            TitleScore.objects.rebuild(Title.objects.all())
+
+    def import_parallel(self, datasets, workers, split, chunk_size,
+                        use_copy):
+        """
+        Загружаем наборы данных пулом потоков с учётом внешних ключей.
+
+        Набор данных запускается, как только загружены все наборы,
+        на которые ссылаются его внешние ключи. Крупный файл читается
+        один раз, а его порции записывают несколько потоков. На время
+        загрузки удаляются вторичные индексы моделей, после загрузки они
+        создаются заново.
+        """
+        if connection.vendor == "sqlite" and workers * split > 1:
+            self.stdout.write(self.style.WARNING(
+                "SQLite не поддерживает параллельную запись, "
+                "используется один поток"
+            ))
+            workers = split = 1
+        dependencies = self.build_dependencies(datasets)
+        paths = dict(datasets)
+        timings = []
+        started = time.monotonic()
+
+        stage_started = time.monotonic()
+        dropped = self.drop_indexes(paths)
+        timings.append(("Удаление индексов", None,
+                        time.monotonic() - stage_started))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                self.run_pipeline(
+                    executor, dependencies, paths, split, chunk_size,
+                    use_copy, timings
                 )
+        finally:
+            stage_started = time.monotonic()
+            self.create_indexes(dropped)
+            timings.append(("Создание индексов", None,
+                            time.monotonic() - stage_started))
+        timings.append(("Всего", None, time.monotonic() - started))
+        self.report_timings(timings)
 
-    def import_data(self, model, csv_file_path):
-        with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            field_names = next(reader)  # Получение заголовков
-            for row in reader:
-                data = {field_names[i]: row[i] for i in range(
-                    len(field_names))}
-                # Распаковываем словарь и создаем объект модели
-                model.objects.create(**data)
-
-        self.stdout.write(self.style.SUCCESS('Successfully imported data'))
+    def run_pipeline(self, executor, dependencies, paths, split, chunk_size,
+                     use_copy, timings):
+        pending = dict(dependencies)
+        done = set()
+        running = {}
+
+        def submit_ready():
+            for model in [model for model, deps in pending.items()
+                          if deps <= done]:
+                del pending[model]
+                parts = split if os.path.getsize(
+                    paths[model]
+                ) >= SPLIT_MIN_FILE_SIZE else 1
+                future = executor.submit(
+                    self.run_in_thread, self.import_data, model,
+                    paths[model], chunk_size, use_copy, parts
+                )
+                running[future] = (model, time.monotonic())
+
+        submit_ready()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                model, model_started = running.pop(future)
+                timings.append((model._meta.label, future.result(),
+                                time.monotonic() - model_started))
+                done.add(model)
+            submit_ready()
+
+    @staticmethod
+    def run_in_thread(function, *args):
+        try:
+            return function(*args)
+        finally:
+            # У каждого потока своё соединение с БД
+            connections.close_all()
+
+    @staticmethod
+    def build_dependencies(datasets):
+        """Строим граф зависимостей между загружаемыми моделями."""
+        models = {model for model, _ in datasets}
+        if len(models) != len(datasets):
+            raise CommandError(
+                "В параллельном режиме каждая модель загружается одним файлом"
+            )
+        dependencies = {}
+        for model in models:
+            dependencies[model] = {
+                field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model in models
+                and field.related_model is not model
+            }
+        resolved = set()
+        while len(resolved) < len(models):
+            ready = {model for model, deps in dependencies.items()
+                     if model not in resolved and deps <= resolved}
+            if not ready:
+                raise CommandError("Циклическая зависимость между моделями")
+            resolved |= ready
+        return dependencies
+
+    @staticmethod
+    def drop_indexes(models):
+        dropped = []
+        with connection.schema_editor() as schema_editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    schema_editor.remove_index(model, index)
+                    dropped.append((model, index))
+        return dropped
+
+    @staticmethod
+    def create_indexes(dropped):
+        with connection.schema_editor() as schema_editor:
+            for model, index in dropped:
+                schema_editor.add_index(model, index)
+
+    def report_timings(self, timings):
+        self.stdout.write("Этап".ljust(32) + "Строк".rjust(12)
+                          + "Секунд".rjust(10) + "Строк/с".rjust(12))
+        for stage, rows, seconds in timings:
+            count = rate = ""
+            if rows is not None:
+                count = str(rows)
+                rate = f"{rows / seconds:.0f}" if seconds else count
+            self.stdout.write(
+                stage.ljust(32) + count.rjust(12)
+                + f"{seconds:.2f}".rjust(10) + rate.rjust(12)
+            )
+
+    def resolve_columns(self, model, header):
+        """
+        Сопоставляем заголовки csv с полями модели.
+
+        Внешние ключи принимаются и как `category`, и как `category_id`
+        и всегда записываются по первичному ключу, без запросов к БД.
+        """
+        fields = []
+        for column in header:
+            try:
+                field = model._meta.get_field(column)
+            except FieldDoesNotExist:
+                field = None
+            if not getattr(field, "concrete", False):
+                raise CommandError(
+                    f"{model._meta.label}: неизвестная колонка '{column}'"
+                )
+            fields.append(field)
+        return fields
+
+    @staticmethod
+    def build_object(model, fields, row):
+        data = {
+            field.attname: None if value == "" and field.null else value
+            for field, value in zip(fields, row)
+        }
+        return model(**data)
+
+    @staticmethod
+    def copy_objects(model, fields, objects):
+        """Записываем порцию объектов через COPY ... FROM STDIN."""
+        provided = {field.attname for field in fields}
+        columns = [
+            field for field in model._meta.concrete_fields
+            if not (field.primary_key and field.attname not in provided)
+        ]
+        buffer = io.StringIO()
+        for obj in objects:
+            values = (
+                field.get_db_prep_save(field.pre_save(obj, True), connection)
+                for field in columns
+            )
+            buffer.write(",".join(
+                COPY_NULL if value is None
+                else '"' + str(value).replace('"', '""') + '"'
+                for value in values
+            ))
+            buffer.write("\n")
+        buffer.seek(0)
+        quote_name = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '{}')".format(
+                    quote_name(model._meta.db_table),
+                    ", ".join(quote_name(field.column) for field in columns),
+                    COPY_NULL,
+                ),
+                buffer,
+            )
+
+    @staticmethod
+    def reset_sequences(model):
+        """Сдвигаем последовательности после загрузки явных id."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+    def report(self, label, imported, started):
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else imported
+        self.stdout.write(
+            f"{label}: {imported} строк, {rate:.0f} строк/с"
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_cache_version
+from reviews.models import Title, TitleScore
+
+
+class Command(BaseCommand):
+    help = ("Пересчёт рейтинга, числа отзывов, суммы оценок "
+            "и гистограммы оценок произведений.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Title.objects.all().recalculate_rating()
+            TitleScore.objects.rebuild(Title.objects.all())
+        # update() не вызывает сигналы, сбрасывающие кэш
+        bump_cache_version(Title)
+        self.stdout.write(self.style.SUCCESS(
+            f"Рейтинг пересчитан для {updated} произведений"
+        ))
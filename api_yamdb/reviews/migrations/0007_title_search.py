@@ -0,0 +1,72 @@
+# Generated by Django 3.2 on 2026-10-18 04:10
+
+from django.db import migrations
+
+SQLITE_FTS_SQL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5('
+    "name, description, content='reviews_title', content_rowid='id')",
+    'CREATE TRIGGER IF NOT EXISTS reviews_title_fts_ai '
+    'AFTER INSERT ON reviews_title BEGIN '
+    'INSERT INTO reviews_title_fts(rowid, name, description) '
+    'VALUES (new.id, new.name, new.description); END',
+    'CREATE TRIGGER IF NOT EXISTS reviews_title_fts_ad '
+    'AFTER DELETE ON reviews_title BEGIN '
+    'INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, '
+    "description) VALUES ('delete', old.id, old.name, old.description); END",
+    # Обновление рейтинга не должно переписывать полнотекстовый индекс
+    'CREATE TRIGGER IF NOT EXISTS reviews_title_fts_au '
+    'AFTER UPDATE OF name, description ON reviews_title BEGIN '
+    'INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, '
+    "description) VALUES ('delete', old.id, old.name, old.description); "
+    'INSERT INTO reviews_title_fts(rowid, name, description) '
+    'VALUES (new.id, new.name, new.description); END',
+    "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DROP_FTS_SQL = (
+    'DROP TRIGGER IF EXISTS reviews_title_fts_au',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_ad',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_ai',
+    'DROP TABLE IF EXISTS reviews_title_fts',
+)
+
+# Выражение совпадает с документом PostgresSearchBackend из api/search.py
+POSTGRES_SEARCH_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS title_search_idx ON reviews_title '
+    "USING gin (to_tsvector('simple'::regconfig, "
+    "COALESCE(\"reviews_title\".\"name\", '') || ' ' || "
+    "COALESCE(\"reviews_title\".\"description\", '')))",
+)
+
+POSTGRES_DROP_SEARCH_INDEX_SQL = (
+    'DROP INDEX IF EXISTS title_search_idx',
+)
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRES_SEARCH_INDEX_SQL,
+        'sqlite': SQLITE_FTS_SQL,
+    }.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRES_DROP_SEARCH_INDEX_SQL,
+        'sqlite': SQLITE_DROP_FTS_SQL,
+    }.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_genre_title_unique_and_name_trgm'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
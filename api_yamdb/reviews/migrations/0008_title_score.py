@@ -0,0 +1,56 @@
+# Generated by Django 3.2 on 2026-10-18 03:05
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+SCORES = range(1, 11)
+
+
+def fill_title_scores(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    TitleScore = apps.get_model('reviews', 'TitleScore')
+    counts = {
+        (title_id, score): count
+        for title_id, score, count in Review.objects.order_by().values_list(
+            'title', 'score'
+        ).annotate(Count('pk'))
+    }
+    TitleScore.objects.bulk_create((
+        TitleScore(
+            title_id=title_id,
+            score=score,
+            count=counts.get((title_id, score), 0),
+        )
+        for title_id in Title.objects.values_list('pk', flat=True).iterator()
+        for score in SCORES
+    ), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_counts', to='reviews.title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'оценки произведения',
+                'verbose_name_plural': 'Оценки произведений',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='titlescore',
+            constraint=models.UniqueConstraint(fields=('title', 'score'), name='unique_title_score'),
+        ),
+        migrations.RunPython(fill_title_scores, migrations.RunPython.noop),
+    ]
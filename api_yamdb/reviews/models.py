@@ -1,10 +1,12 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
 
 from reviews.constants import (CUT_STR_LONGER, NAME_MAX_LENGTH,
-                               SCORE_MAX_VALUE, SCORE_MIN_VALUE,
-                               SLUG_MAX_LENGTH)
+                               SCORE_MAX_VALUE, SCORE_MIN_VALUE, SCORES,
+                               SLUG_MAX_LENGTH, TITLE_SCORE_BATCH_SIZE)
 from reviews.validators import validate_year
 
 User = get_user_model()
@@ -54,6 +56,44 @@ class Genre(ModelForCategoryGenre):
         verbose_name_plural = "Жанры"
 
 
+class TitleQuerySet(models.QuerySet):
+    """QuerySet произведений с поддержкой денормализованного рейтинга."""
+
+    def apply_review_delta(self, score_delta, count_delta):
+        """Атомарно сдвигаем сумму оценок и число отзывов произведений."""
+        review_count = F("review_count") + count_delta
+        score_sum = F("score_sum") + score_delta
+        return self.update(
+            review_count=review_count,
+            score_sum=score_sum,
+            rating=models.Case(
+                models.When(
+                    Q(review_count__lte=-count_delta),
+                    then=None,
+                ),
+                default=Cast(score_sum, FloatField()) / review_count,
+                output_field=FloatField(),
+            ),
+        )
+
+    def recalculate_rating(self):
+        """Пересчитываем рейтинг произведений по таблице отзывов."""
+        reviews = Review.objects.filter(
+            title=OuterRef("pk")
+        ).order_by().values("title")
+        review_count = Subquery(
+            reviews.annotate(value=Count("pk")).values("value")
+        )
+        score_sum = Subquery(
+            reviews.annotate(value=Sum("score")).values("value")
+        )
+        return self.update(
+            review_count=Coalesce(review_count, 0),
+            score_sum=Coalesce(score_sum, 0),
+            rating=Cast(score_sum, FloatField()) / review_count,
+        )
+
+
 class Title(models.Model):
     """Модель произведений"""
     name = models.CharField(max_length=NAME_MAX_LENGTH, verbose_name="Имя")
@@ -77,8 +117,28 @@ class Title(models.Model):
         related_name="titles",
         verbose_name="Категория"
     )
+    rating = models.FloatField(
+        null=True,
+        editable=False,
+        verbose_name="Рейтинг"
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество отзывов"
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Сумма оценок"
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
+        indexes = (
+            models.Index(fields=("-year", "id"), name="title_year_id_idx"),
+        )
         verbose_name = "произведение"
         verbose_name_plural = "Произведения"
 
@@ -112,11 +172,35 @@ class Review(BasePost):
             fields=["title", "author"],
             name="Only_one_review_from_author_for_title"
         )]
+        indexes = (
+            models.Index(
+                fields=("title", "pub_date", "id"),
+                name="review_title_pub_date_idx"
+            ),
+        )
         verbose_name = "отзыв"
         verbose_name_plural = "Отзывы"
         default_related_name = "reviews"
         ordering = ("pub_date",)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def remember_rating_state(self):
+        """Запоминаем сохранённые в БД произведение и оценку отзыва."""
+        self._rating_state = (
+            self.__dict__.get("title_id"),
+            self.__dict__.get("score"),
+        )
+
+    def save(self, *args, **kwargs):
+        # Отзыв и рейтинг произведения должны меняться в одной транзакции
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
 
 class Comment(BasePost):
     """Модель комментариев"""
@@ -128,6 +212,12 @@ class Comment(BasePost):
     )
 
     class Meta:
+        indexes = (
+            models.Index(
+                fields=("review", "pub_date", "id"),
+                name="comment_review_pub_date_idx"
+            ),
+        )
         verbose_name = "комментарий"
         verbose_name_plural = "Комментарии"
         default_related_name = "comments"
@@ -139,5 +229,78 @@ class GenreTitle(models.Model):
     genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
     title = models.ForeignKey(Title, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=["genre", "title"],
+            name="unique_genre_title"
+        )]
+
     def __str__(self):
         return f"{self.genre} {self.title}"
+
+
+class TitleScoreQuerySet(models.QuerySet):
+    """QuerySet гистограммы оценок произведений."""
+
+    def apply_review_delta(self, title_id, score, count_delta):
+        """Атомарно сдвигаем число отзывов с оценкой score."""
+        updated = self.filter(title_id=title_id, score=score).update(
+            count=F("count") + count_delta
+        )
+        if not updated and count_delta > 0:
+            # Строки гистограммы не созданы, например, после bulk_create
+            self.rebuild(Title.objects.filter(pk=title_id))
+
+    def create_empty(self, titles):
+        """Создаём нулевые строки гистограммы для новых произведений."""
+        return self.bulk_create(
+            TitleScore(title=title, score=score)
+            for title in titles for score in SCORES
+        )
+
+    def rebuild(self, titles):
+        """Пересчитываем гистограммы произведений по таблице отзывов."""
+        counts = {
+            (title_id, score): count
+            for title_id, score, count in Review.objects.filter(
+                title__in=titles
+            ).order_by().values_list("title", "score").annotate(Count("pk"))
+        }
+        self.filter(title__in=titles).delete()
+        self.bulk_create((
+            TitleScore(
+                title_id=title_id,
+                score=score,
+                count=counts.get((title_id, score), 0),
+            )
+            for title_id in titles.values_list("pk", flat=True).iterator()
+            for score in SCORES
+        ), batch_size=TITLE_SCORE_BATCH_SIZE)
+
+
+class TitleScore(models.Model):
+    """Количество отзывов к произведению с данной оценкой."""
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name="score_counts",
+        verbose_name="Произведение"
+    )
+    score = models.PositiveSmallIntegerField(verbose_name="Оценка")
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество отзывов"
+    )
+
+    objects = TitleScoreQuerySet.as_manager()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=["title", "score"],
+            name="unique_title_score"
+        )]
+        verbose_name = "оценки произведения"
+        verbose_name_plural = "Оценки произведений"
+
+    def __str__(self):
+        return f"{self.title} {self.score}: {self.count}"
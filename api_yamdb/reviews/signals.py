@@ -0,0 +1,64 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Review, Title, TitleScore
+
+
+@receiver(post_save, sender=Title)
+def create_score_histogram(sender, instance, created, raw=False, **kwargs):
+    """Создаём пустую гистограмму оценок нового произведения."""
+    if created and not raw:
+        TitleScore.objects.create_empty([instance])
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Поддерживаем рейтинг и гистограмму оценок произведения
+    при создании и изменении отзыва.
+    """
+    if raw:
+        return
+    old_title_id, old_score = getattr(
+        instance, "_rating_state", (None, None)
+    )
+    if created:
+        Title.objects.filter(pk=instance.title_id).apply_review_delta(
+            instance.score, 1
+        )
+        TitleScore.objects.apply_review_delta(
+            instance.title_id, instance.score, 1
+        )
+    elif old_title_id is None or old_score is None:
+        # Исходное состояние отзыва неизвестно - пересчитываем целиком
+        titles = Title.objects.filter(pk=instance.title_id)
+        titles.recalculate_rating()
+        TitleScore.objects.rebuild(titles)
+    elif (old_title_id, old_score) != (instance.title_id, instance.score):
+        if old_title_id != instance.title_id:
+            Title.objects.filter(pk=old_title_id).apply_review_delta(
+                -old_score, -1
+            )
+            Title.objects.filter(pk=instance.title_id).apply_review_delta(
+                instance.score, 1
+            )
+        else:
+            Title.objects.filter(pk=instance.title_id).apply_review_delta(
+                instance.score - old_score, 0
+            )
+        TitleScore.objects.apply_review_delta(old_title_id, old_score, -1)
+        TitleScore.objects.apply_review_delta(
+            instance.title_id, instance.score, 1
+        )
+    instance.remember_rating_state()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Убираем оценку удалённого отзыва из рейтинга произведения."""
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(
+        -instance.score, -1
+    )
+    TitleScore.objects.apply_review_delta(
+        instance.title_id, instance.score, -1
+    )
@@ -2,7 +2,23 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
 
+from users.models import OutgoingEmail
+
 
 User = get_user_model()
 
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "recipient",
+        "subject",
+        "created_at",
+        "attempts",
+        "sent_at",
+    )
+    search_fields = ("recipient",)
+    list_filter = ("sent_at",)
+
+
 admin.site.register(User, UserAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -20,3 +20,26 @@ USERNAME_MAX_LENGTH = 150
 ROLE_MAX_LENGTH = 50
 
 CONFIRMATION_CODE_MAX_LENGTH = 50
+
+# Утверждения JWT, по которым пользователь восстанавливается без БД
+ROLE_CLAIM = "role"
+
+TOKEN_VERSION_CLAIM = "token_version"
+
+TOKEN_USER_CLAIMS = ("role", "is_staff", "is_superuser", "username")
+
+# Ключ кэша с версией токенов и флагом is_active пользователя
+TOKEN_STATE_CACHE_KEY = "jwt-state:{}"
+
+# Количество писем, отправляемых за один проход обработчика очереди
+EMAIL_BATCH_SIZE = 100
+
+# Количество попыток отправки письма до отказа
+EMAIL_MAX_ATTEMPTS = 5
+
+# Задержка перед повторной отправкой письма, секунды
+EMAIL_RETRY_BASE_DELAY = 60
+
+EMAIL_RETRY_MAX_DELAY = 60 * 60
+
+EMAIL_SUBJECT_MAX_LENGTH = 255
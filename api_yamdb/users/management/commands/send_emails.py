@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.constants import EMAIL_BATCH_SIZE, EMAIL_MAX_ATTEMPTS
+from users.outbox import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = ("Отправка писем из очереди. С флагом --loop команда "
+            "работает постоянно и опрашивает очередь.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=EMAIL_BATCH_SIZE,
+            help="Количество писем, отправляемых за один проход",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=EMAIL_MAX_ATTEMPTS,
+            help="Количество попыток отправки письма",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Не завершаться, а ждать новых писем",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Пауза между проходами при пустой очереди, секунды",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, failed = send_queued_emails(
+                    options["batch_size"], options["max_attempts"]
+                )
+            except Exception as error:
+                if not options["loop"]:
+                    raise
+                # Например, БД недоступна: повторяем после паузы
+                self.stderr.write(f"Ошибка отправки писем: {error!r}")
+                sent = failed = 0
+            if sent or failed:
+                self.stdout.write(
+                    f"Отправлено писем: {sent}, ошибок: {failed}"
+                )
+            if not options["loop"]:
+                break
+            if sent + failed < options["batch_size"]:
+                time.sleep(options["interval"])
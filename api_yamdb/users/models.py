@@ -1,7 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
-from users.constants import (CONFIRMATION_CODE_MAX_LENGTH, ROLE_MAX_LENGTH,
+from users.constants import (CONFIRMATION_CODE_MAX_LENGTH,
+                             EMAIL_SUBJECT_MAX_LENGTH, ROLE_MAX_LENGTH,
                              USERNAME_MAX_LENGTH, Roles)
 from users.validators import username_validator
 
@@ -25,12 +27,29 @@ class YamdbUser(AbstractUser):
     confirmation_code = models.CharField(
         max_length=CONFIRMATION_CODE_MAX_LENGTH
     )
+    # Увеличивается при отзыве токенов, см. revoke_user_tokens
+    token_version = models.PositiveIntegerField(
+        "Версия токенов", default=0, editable=False
+    )
+
+    # Имя пользователя, сохранённое в БД, см. remember_username
+    saved_username = None
 
     class Meta:
         verbose_name = "пользователь"
         verbose_name_plural = "Пользователи"
         ordering = ("username",)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_username()
+        return instance
+
+    def remember_username(self):
+        """Запоминаем сохранённое в БД имя пользователя."""
+        self.saved_username = self.__dict__.get("username")
+
     @property
     def is_admin(self):
         """Возвращает True, если у пользователя права администратора."""
@@ -40,3 +59,32 @@ class YamdbUser(AbstractUser):
     def is_moderator(self):
         """Возвращает True, если у пользователя права модератора."""
         return self.role == Roles.MODERATOR
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку."""
+
+    subject = models.CharField("Тема", max_length=EMAIL_SUBJECT_MAX_LENGTH)
+    message = models.TextField("Текст")
+    from_email = models.EmailField("Отправитель")
+    recipient = models.EmailField("Получатель")
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    send_after = models.DateTimeField("Отправить после", default=timezone.now)
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    sent_at = models.DateTimeField("Отправлено", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "исходящее письмо"
+        verbose_name_plural = "Исходящие письма"
+        ordering = ("send_after", "id")
+        indexes = (
+            models.Index(
+                fields=("send_after", "id"),
+                condition=models.Q(sent_at__isnull=True),
+                name="outgoing_email_queue_idx"
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.recipient}: {self.subject}"
@@ -0,0 +1,108 @@
+"""Очередь исходящих писем."""
+
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from users.constants import (EMAIL_BATCH_SIZE, EMAIL_MAX_ATTEMPTS,
+                             EMAIL_RETRY_BASE_DELAY, EMAIL_RETRY_MAX_DELAY)
+from users.models import OutgoingEmail
+
+
+def queue_email(subject, message, from_email, recipient):
+    """Ставим письмо в очередь на отправку."""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=from_email,
+        recipient=recipient,
+    )
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой отправки."""
+    return timedelta(seconds=min(
+        EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), EMAIL_RETRY_MAX_DELAY
+    ))
+
+
+def defer_email(email, error):
+    """Учитываем неудачную попытку и откладываем письмо."""
+    email.attempts += 1
+    email.last_error = repr(error)
+    email.send_after = timezone.now() + retry_delay(email.attempts)
+
+
+def send_emails(connection, emails):
+    """Отправляем письма через открытое соединение."""
+    sent = failed = 0
+    for email in emails:
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.message,
+            from_email=email.from_email,
+            to=(email.recipient,),
+            connection=connection,
+        )
+        try:
+            message.send()
+        except Exception as error:
+            defer_email(email, error)
+            failed += 1
+        else:
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            sent += 1
+    return sent, failed
+
+
+def close_connection(connection):
+    """Закрываем соединение; ошибка закрытия не отменяет отправку."""
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def send_queued_emails(batch_size=EMAIL_BATCH_SIZE,
+                       max_attempts=EMAIL_MAX_ATTEMPTS):
+    """
+    Отправляем порцию писем из очереди через одно соединение с сервером.
+
+    Письма блокируются через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    несколько обработчиков могут работать одновременно. Неотправленные
+    письма, в том числе вся порция при недоступном сервере, откладываются
+    с экспоненциальной задержкой.
+    Возвращает пару (отправлено, ошибок).
+    """
+    sent = failed = 0
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True).filter(
+                sent_at__isnull=True,
+                attempts__lt=max_attempts,
+                send_after__lte=timezone.now(),
+            )[:batch_size]
+        )
+        if not emails:
+            return sent, failed
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as error:
+            # Сервер недоступен: откладываем всю порцию
+            for email in emails:
+                defer_email(email, error)
+            failed = len(emails)
+        else:
+            try:
+                sent, failed = send_emails(connection, emails)
+            finally:
+                close_connection(connection)
+        OutgoingEmail.objects.bulk_update(
+            emails, ("attempts", "last_error", "send_after", "sent_at")
+        )
+    return sent, failed
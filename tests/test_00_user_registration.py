@@ -2,12 +2,17 @@ from http import HTTPStatus
 
 import pytest
 from django.core import mail
+from django.core.management import call_command
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from tests.utils import (
     invalid_data_for_user_patch_and_creation,
     invalid_data_for_username_and_email_fields
 )
+from users.models import OutgoingEmail
 
 
 @pytest.mark.django_db(transaction=True)
@@ -375,3 +380,139 @@ class Test00UserRegistration:
             'пользователя, созданного администратором,  возвращает ответ '
             'со статусом 200.'
         )
+
+    def test_signup_email_queued_in_outbox(self, client, settings):
+        settings.EMAIL_OUTBOX_ENABLED = True
+        outbox_before_count = len(mail.outbox)
+        valid_data = {
+            'email': 'queued@yamdb.fake',
+            'username': 'queued_username'
+        }
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        assert len(mail.outbox) == outbox_before_count, (
+            'Если включена очередь писем, письмо с кодом подтверждения '
+            'не должно отправляться во время обработки запроса к '
+            f'`{self.URL_SIGNUP}`.'
+        )
+
+        call_command('send_emails')
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что команда `send_emails` отправляет письма из '
+            'очереди.'
+        )
+        assert valid_data['email'] in mail.outbox[-1].to
+
+        call_command('send_emails')
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что команда `send_emails` не отправляет письмо '
+            'повторно.'
+        )
+
+    def test_outbox_smtp_unavailable(self, client, settings, monkeypatch):
+        settings.EMAIL_OUTBOX_ENABLED = True
+        outbox_before_count = len(mail.outbox)
+
+        def refuse(backend):
+            raise ConnectionRefusedError(111, 'Connection refused')
+
+        monkeypatch.setattr(
+            'django.core.mail.backends.locmem.EmailBackend.open', refuse
+        )
+        response = client.post(self.URL_SIGNUP, data={
+            'email': 'unavailable@yamdb.fake',
+            'username': 'unavailable_username'
+        })
+        assert response.status_code == HTTPStatus.OK
+        call_command('send_emails')
+        assert len(mail.outbox) == outbox_before_count
+        email = OutgoingEmail.objects.get()
+        assert email.sent_at is None
+        assert email.attempts == 1 and 'ConnectionRefusedError' in (
+            email.last_error
+        ), (
+            'Проверьте, что при недоступном почтовом сервере команда '
+            '`send_emails` записывает попытку и ошибку отправки.'
+        )
+        assert email.send_after > timezone.now(), (
+            'Проверьте, что при недоступном почтовом сервере письмо '
+            'откладывается.'
+        )
+
+    def test_repeated_signup_query_count(self, client, django_user_model):
+        valid_data = {
+            'email': 'repeated@yamdb.fake',
+            'username': 'repeated_username'
+        }
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        code = django_user_model.objects.get(
+            username=valid_data['username']
+        ).confirmation_code
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        assert len(context.captured_queries) == 2, (
+            f'Проверьте, что повторный POST-запрос к `{self.URL_SIGNUP}` '
+            'ищет пользователя одним запросом и обновляет только код '
+            'подтверждения.'
+        )
+        assert django_user_model.objects.get(
+            username=valid_data['username']
+        ).confirmation_code != code
+
+    def test_signed_confirmation_code(self, client, settings):
+        settings.SIGNED_CONFIRMATION_CODES = True
+        valid_data = {
+            'email': 'signed@yamdb.fake',
+            'username': 'signed_username'
+        }
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        code = mail.outbox[-1].body.split(': ')[-1]
+        token_data = {
+            'username': valid_data['username'],
+            'confirmation_code': code
+        }
+
+        settings.CONFIRMATION_CODE_TIMEOUT = -1
+        response = client.post(self.URL_TOKEN, data=token_data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что подписанный код подтверждения с истёкшим сроком '
+            f'действия не принимается эндпоинтом `{self.URL_TOKEN}`.'
+        )
+
+        settings.CONFIRMATION_CODE_TIMEOUT = 60
+        response = client.post(self.URL_TOKEN, data=token_data)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что эндпоинт `{self.URL_TOKEN}` выдаёт токен по '
+            'подписанному коду подтверждения.'
+        )
+        assert 'token' in response.json()
+
+        response = client.post(self.URL_TOKEN, data=token_data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что подписанный код подтверждения нельзя '
+            f'использовать повторно на эндпоинте `{self.URL_TOKEN}`.'
+        )
+
+    def test_obtain_token_query_count(self, client, django_user_model):
+        valid_data = {
+            'email': 'token@yamdb.fake',
+            'username': 'token_username'
+        }
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        user = django_user_model.objects.get(username=valid_data['username'])
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(self.URL_TOKEN, data={
+                'username': user.username,
+                'confirmation_code': user.confirmation_code
+            })
+        assert response.status_code == HTTPStatus.OK
+        assert len(context.captured_queries) == 1, (
+            f'Проверьте, что POST-запрос к `{self.URL_TOKEN}` получает '
+            'пользователя из БД только один раз.'
+        )
@@ -1,7 +1,12 @@
 from http import HTTPStatus
 
 import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
+from api.user_auth_utils import get_tokens_for_user
 from tests.utils import (
     check_pagination, invalid_data_for_user_patch_and_creation
 )
@@ -564,3 +569,85 @@ class Test01UserAPI:
             f'Проверьте, что PATCH-запрос к `{self.USERS_ME_URL}` с ключом '
             '`role` не изменяет роль пользователя.'
         )
+
+    def test_11_token_claims_and_revocation(self, admin, admin_client,
+                                            moderator):
+        token = get_tokens_for_user(admin)['token']
+        claims_admin_client = APIClient()
+        claims_admin_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        token = get_tokens_for_user(moderator)['token']
+        moderator_client = APIClient()
+        moderator_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        with CaptureQueriesContext(connection) as context:
+            response = claims_admin_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert len(context.captured_queries) == 2, (
+            'Проверьте, что для токена, выданного эндпоинтом получения '
+            'токена, права администратора проверяются без запроса к '
+            'таблице пользователей.'
+        )
+
+        response = moderator_client.get(self.USERS_ME_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json().get('role') == 'moderator'
+
+        response = admin_client.patch(
+            f'{self.USERS_URL}{moderator.username}/', data={'bio': 'new bio'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = moderator_client.get(self.USERS_ME_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение данных пользователя, не влияющих на '
+            'права доступа, не отзывает его токены.'
+        )
+
+        response = admin_client.patch(
+            f'{self.USERS_URL}{moderator.username}/', data={'role': 'user'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = moderator_client.get(self.USERS_ME_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что после изменения роли пользователя через '
+            f'`{self.USERS_URL}' + '{username}/` выданные ему ранее токены '
+            'отклоняются.'
+        )
+
+    def test_12_token_revocation_survives_cache_eviction(
+        self, settings, admin_client, moderator
+    ):
+        moderator_client = APIClient()
+        moderator_client.credentials(
+            HTTP_AUTHORIZATION=(
+                f'Bearer {get_tokens_for_user(moderator)["token"]}'
+            )
+        )
+        assert moderator_client.get(self.USERS_ME_URL).status_code == (
+            HTTPStatus.OK
+        )
+        response = admin_client.patch(
+            f'{self.USERS_URL}{moderator.username}/', data={'role': 'user'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        caches[settings.TOKEN_STATE_CACHE_ALIAS].clear()
+        response = moderator_client.get(self.USERS_ME_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что отзыв токенов хранится в БД и не теряется при '
+            'вытеснении записи из кэша.'
+        )
+
+        moderator.refresh_from_db()
+        moderator_client.credentials(
+            HTTP_AUTHORIZATION=(
+                f'Bearer {get_tokens_for_user(moderator)["token"]}'
+            )
+        )
+        assert moderator_client.get(self.USERS_ME_URL).status_code == (
+            HTTPStatus.OK
+        )
+        moderator.is_active = False
+        moderator.save()
+        response = moderator_client.get(self.USERS_ME_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токены неактивного пользователя отклоняются.'
+        )
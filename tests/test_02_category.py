@@ -1,7 +1,10 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from reviews.models import Category
 from tests.utils import (
     check_name_and_slug_patterns, check_pagination, check_permissions,
     create_categories
@@ -153,3 +156,43 @@ class Test02CategoryAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, self.CATEGORY_URL, data,
                           'модератора', categories, HTTPStatus.FORBIDDEN)
+
+    def test_06_category_list_cache(self, client, admin_client):
+        categories = create_categories(admin_client)
+        client.get(self.CATEGORY_URL)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.CATEGORY_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert len(context.captured_queries) == 0, (
+            f'Проверьте, что повторный GET-запрос к `{self.CATEGORY_URL}` '
+            'отдаёт список из кэша без запросов к БД.'
+        )
+
+        admin_client.post(
+            self.CATEGORY_URL, data={'name': 'Музыка', 'slug': 'music'}
+        )
+        response = client.get(self.CATEGORY_URL)
+        assert response.json()['count'] == len(categories) + 1, (
+            f'Проверьте, что создание категории сбрасывает кэш '
+            f'`{self.CATEGORY_URL}`.'
+        )
+
+        admin_client.delete(
+            self.CATEGORY_SLUG_TEMPLATE_URL.format(slug='music')
+        )
+        response = client.get(self.CATEGORY_URL)
+        assert response.json()['count'] == len(categories), (
+            f'Проверьте, что удаление категории сбрасывает кэш '
+            f'`{self.CATEGORY_URL}`.'
+        )
+
+        # Изменение в админке проходит через save() модели
+        category = Category.objects.get(slug=categories[0]['slug'])
+        category.name = 'Новое название'
+        category.save()
+        response = client.get(self.CATEGORY_URL)
+        names = {element['name'] for element in response.json()['results']}
+        assert 'Новое название' in names, (
+            'Проверьте, что изменение категории в админке сбрасывает кэш '
+            f'`{self.CATEGORY_URL}`.'
+        )
@@ -1,7 +1,14 @@
+import io
+import json
+from base64 import urlsafe_b64encode
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from reviews.models import Genre, GenreTitle, Review
 from tests.utils import (
     check_pagination, check_permissions, create_categories, create_genre,
     create_titles
@@ -353,3 +360,366 @@ class Test04TitleAPI:
             f'Проверьте, что PUT-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_titles_list_query_count(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        queries_for_two_titles = len(context.captured_queries)
+
+        for idx in range(3):
+            admin_client.post(self.TITLES_URL, data={
+                'name': f'Произведение {idx}',
+                'year': 2000 + idx,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[idx % 2]['slug'],
+            })
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL)
+        assert len(response.json()['results']) == len(titles) + 3
+        assert len(context.captured_queries) == queries_for_two_titles, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` выполняет '
+            'одинаковое число запросов к БД вне зависимости от количества '
+            'произведений на странице: жанры и категории произведений '
+            'должны загружаться заранее.'
+        )
+
+    def test_08_titles_cursor_pagination(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        for idx in range(6):
+            response = admin_client.post(self.TITLES_URL, data={
+                'name': f'Произведение {idx}',
+                'year': 1984 + idx % 3,
+                'genre': [genres[0]['slug']],
+                'category': categories[0]['slug'],
+            })
+            titles.append(response.json())
+        expected = [
+            title['id'] for title in sorted(
+                titles, key=lambda title: (-title['year'], title['id'])
+            )
+        ]
+
+        url = f'{self.TITLES_URL}?pagination=cursor'
+        received = []
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert 'count' not in data, (
+                f'Проверьте, что в режиме курсора `{self.TITLES_URL}` не '
+                'считает общее количество объектов.'
+            )
+            pages.append([title['id'] for title in data['results']])
+            received.extend(pages[-1])
+            url = data['next']
+        assert received == expected, (
+            f'Проверьте, что в режиме курсора `{self.TITLES_URL}` '
+            'возвращает все произведения по одному разу в порядке '
+            '(-year, id).'
+        )
+
+        response = client.get(data['previous'])
+        assert [title['id'] for title in response.json()['results']] == (
+            pages[-2]
+        ), (
+            f'Проверьте, что в режиме курсора `{self.TITLES_URL}` ссылка '
+            '`previous` ведёт на предыдущую страницу.'
+        )
+
+        response = client.get(self.TITLES_URL, HTTP_X_PAGINATION='cursor')
+        assert response.json()['next'], (
+            'Проверьте, что режим курсора включается заголовком '
+            '`X-Pagination: cursor`.'
+        )
+        response = client.get(f'{self.TITLES_URL}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_09_titles_search(self, client, admin_client):
+        _, categories, genres = create_titles(admin_client)
+        for name, description in (
+            ('Крестный отец', 'Сага о семье Корлеоне'),
+            ('Крестный отец 2', 'Продолжение саги о семье Корлеоне'),
+            ('Отец солдата', ''),
+        ):
+            admin_client.post(self.TITLES_URL, data={
+                'name': name,
+                'description': description,
+                'year': 1972,
+                'genre': [genres[0]['slug']],
+                'category': categories[0]['slug'],
+            })
+
+        response = client.get(f'{self.TITLES_URL}?search=крестн')
+        assert response.status_code == HTTPStatus.OK
+        names = {title['name'] for title in response.json()['results']}
+        assert names == {'Крестный отец', 'Крестный отец 2'}, (
+            f'Проверьте, что `{self.TITLES_URL}?search=` находит произведения '
+            'по началу слова в названии.'
+        )
+
+        response = client.get(f'{self.TITLES_URL}?search=корлеоне')
+        assert response.json()['count'] == 2, (
+            f'Проверьте, что `{self.TITLES_URL}?search=` ищет и по описанию.'
+        )
+
+        response = client.get(f'{self.TITLES_URL}?search=отец солдат')
+        assert [title['name'] for title in response.json()['results']] == [
+            'Отец солдата'
+        ], (
+            f'Проверьте, что `{self.TITLES_URL}?search=` возвращает только '
+            'произведения, содержащие все слова запроса.'
+        )
+
+    def test_10_titles_conditional_get(self, settings, client,
+                                       admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get(self.TITLES_URL)
+        etag = response.get('ETag')
+        assert etag and response.get('Last-Modified'), (
+            f'Проверьте, что ответ `{self.TITLES_URL}` содержит заголовки '
+            '`ETag` и `Last-Modified`.'
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с актуальным '
+            '`If-None-Match` возвращает ответ со статусом 304.'
+        )
+        assert len(context.captured_queries) == 0, (
+            'Проверьте, что ответ 304 отдаётся без запросов к БД.'
+        )
+        response = client.get(
+            self.TITLES_URL,
+            HTTP_IF_MODIFIED_SINCE=response.get('Last-Modified')
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        detail_url = self.TITLES_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        detail_etag = client.get(detail_url).get('ETag')
+        user_client.post(
+            f'{detail_url}reviews/', data={'text': 'Отзыв', 'score': 7}
+        )
+        for url, old_etag in ((self.TITLES_URL, etag),
+                              (detail_url, detail_etag)):
+            response = client.get(url, HTTP_IF_NONE_MATCH=old_etag)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что после нового отзыва `{url}` возвращает '
+                'обновлённый рейтинг, а не ответ 304.'
+            )
+            assert response.get('ETag') != old_etag
+
+        etag = client.get(detail_url).get('ETag')
+        Review.objects.update(score=1)
+        call_command('recalculate_ratings', stdout=io.StringIO())
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после команды `recalculate_ratings` '
+            f'`{detail_url}` возвращает новый рейтинг, а не ответ 304.'
+        )
+        assert response.json()['rating'] == 1
+
+        response = client.get(self.TITLES_URL)
+        etag = response.get('ETag')
+        assert 'X-Pagination' in response.get('Vary', ''), (
+            f'Проверьте, что ответ `{self.TITLES_URL}` содержит '
+            '`X-Pagination` в заголовке `Vary`.'
+        )
+        response = client.get(
+            self.TITLES_URL, HTTP_X_PAGINATION='cursor',
+            HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `ETag` постраничного ответа не подходит к '
+            'ответу в режиме курсора по тому же адресу.'
+        )
+        assert response.get('ETag') != etag
+
+        settings.RESPONSE_CACHE_ALIAS = 'default'
+        response = client.get(self.TITLES_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert 'ETag' not in response, (
+            'Проверьте, что с кэшем в памяти процесса условные '
+            'GET-запросы отключены.'
+        )
+
+    def test_11_titles_bulk(self, client, admin_client, user_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = f'{self.TITLES_URL}bulk/'
+        items = [
+            {
+                'name': f'Пакетное произведение {idx}',
+                'year': 2000 + idx,
+                'genre': [genres[0]['slug'], genres[1]['slug']],
+                'category': categories[0]['slug'],
+            } for idx in range(20)
+        ]
+        items.append({
+            'name': 'Без жанра', 'year': 2000,
+            'genre': ['unknown'], 'category': categories[0]['slug'],
+        })
+        items.append({'id': titles[0]['id'], 'genre': [genres[2]['slug']]})
+
+        response = user_client.post(url, data=items, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data=items, format='json')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert (data['created'], data['updated'], data['failed']) == (
+            20, 1, 1
+        ), (
+            f'Проверьте, что POST-запрос к `{url}` создаёт и обновляет '
+            'корректные элементы и возвращает ошибки некорректных.'
+        )
+        assert 'genre' in data['results'][20]['errors']
+        if connection.features.can_return_rows_from_bulk_insert:
+            assert len(context.captured_queries) < 20, (
+                f'Проверьте, что POST-запрос к `{url}` не выполняет запросы '
+                'к БД для каждого произведения.'
+            )
+
+        created = client.get(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(
+                title_id=data['results'][0]['id']
+            )
+        ).json()
+        assert {genre['slug'] for genre in created['genre']} == {
+            genres[0]['slug'], genres[1]['slug']
+        }
+        assert created['category']['slug'] == categories[0]['slug']
+        updated = client.get(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        ).json()
+        assert updated['genre'] == [genres[2]]
+        assert updated['name'] == titles[0]['name']
+
+        ndjson = '\n'.join((
+            '{"name": "NDJSON 1", "year": 1999, "genre": ["%s"], '
+            '"category": "%s"}' % (genres[0]['slug'], categories[1]['slug']),
+            '{"name": "NDJSON 2", "year": 1999, "genre": ["%s"], '
+            '"category": "%s"}' % (genres[1]['slug'], categories[1]['slug']),
+        ))
+        response = admin_client.post(
+            url, data=ndjson, content_type='application/x-ndjson'
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['created'] == 2, (
+            f'Проверьте, что `{url}` принимает NDJSON.'
+        )
+        response = client.get(f'{self.TITLES_URL}?year=1999')
+        assert response.json()['count'] == 2
+
+    def test_12_titles_slug_cache(self, admin_client):
+        _, categories, genres = create_titles(admin_client)
+        post_data = {
+            'name': 'Кэш слагов',
+            'year': 2000,
+            'genre': [genres[0]['slug'], genres[1]['slug']],
+            'category': categories[0]['slug'],
+        }
+        admin_client.post(self.TITLES_URL, data=post_data)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(self.TITLES_URL, data=post_data)
+        assert response.status_code == HTTPStatus.CREATED
+        slug_lookups = [
+            query['sql'] for query in context.captured_queries
+            if '"slug" IN' in query['sql'] or '"slug" =' in query['sql']
+        ]
+        assert not slug_lookups, (
+            f'Проверьте, что POST-запрос к `{self.TITLES_URL}` берёт жанры '
+            'и категорию по слагам из кэша.'
+        )
+
+        admin_client.post(
+            '/api/v1/genres/', data={'name': 'Новый жанр', 'slug': 'new'}
+        )
+        post_data['genre'] = ['new']
+        response = admin_client.post(self.TITLES_URL, data=post_data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что новый жанр сразу доступен при создании '
+            'произведения.'
+        )
+        admin_client.delete('/api/v1/genres/new/')
+        response = admin_client.post(self.TITLES_URL, data=post_data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что удалённый жанр нельзя указать при создании '
+            'произведения.'
+        )
+
+        # Удаление в другом процессе: без сигналов, версия жанров прежняя
+        admin_client.post(
+            '/api/v1/genres/', data={'name': 'Другой жанр', 'slug': 'other'}
+        )
+        post_data['genre'] = ['other']
+        admin_client.post(self.TITLES_URL, data=post_data)
+        with connection.cursor() as cursor:
+            for model, column in ((GenreTitle, 'genre_id'), (Genre, 'id')):
+                cursor.execute(
+                    f'DELETE FROM {model._meta.db_table} WHERE {column} = '
+                    f'(SELECT id FROM {Genre._meta.db_table} '
+                    "WHERE slug = 'other')"
+                )
+        for _ in range(2):
+            response = admin_client.post(self.TITLES_URL, data=post_data)
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что жанр, удалённый в другом процессе, нельзя '
+                'указать при создании произведения.'
+            )
+
+    def test_13_titles_unpaginated_stream(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}?pagination=none'
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming, (
+            f'Проверьте, что `{url}` для администратора отдаёт список потоком.'
+        )
+        data = json.loads(b''.join(response.streaming_content))
+        assert {title['id'] for title in data} == {
+            title['id'] for title in titles
+        }, f'Проверьте, что `{url}` возвращает все произведения.'
+        assert data == [
+            admin_client.get(
+                self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=title['id'])
+            ).json() for title in data
+        ]
+
+        response = client.get(url)
+        assert 'results' in response.json(), (
+            'Проверьте, что без прав администратора пагинация не '
+            'отключается.'
+        )
+
+        etag = admin_client.get(url).get('ETag')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `ETag` списка без пагинации не подходит к '
+            'постраничному ответу по тому же адресу.'
+        )
+
+    def test_14_titles_malformed_cursor(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        reviews_url = f'{self.TITLES_URL}{titles[0]["id"]}/reviews/'
+        for url, position in (
+            (self.TITLES_URL, ['abc', 1]),
+            (self.TITLES_URL, [None, 1]),
+            (self.TITLES_URL, [[1], 1]),
+            (self.TITLES_URL, [1984, {'id': 1}]),
+            (reviews_url, ['notadate', 1]),
+            (reviews_url, ['2024-01-01T00:00:00Z', 'abc']),
+        ):
+            cursor = urlsafe_b64encode(
+                json.dumps({'p': position, 'r': 0}).encode()
+            ).decode()
+            response = client.get(f'{url}?cursor={cursor}')
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                f'Проверьте, что `{url}` с курсором на позицию {position} '
+                'возвращает ответ со статусом 404.'
+            )
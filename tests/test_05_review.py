@@ -1,7 +1,9 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (
     check_fields, check_pagination, create_reviews, create_single_review,
@@ -413,3 +415,184 @@ class Test05ReviewAPI:
             f'Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_rating_follows_review_changes(
+            self, admin_client, admin, user_client, user, moderator_client,
+            moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+
+        response = admin_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ),
+            data={'score': 8}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert admin_client.get(title_url).json().get('rating') == 6, (
+            'Проверьте, что после изменения оценки отзыва рейтинг '
+            f'произведения в ответе на GET-запрос к `{title_url}` '
+            'пересчитывается.'
+        )
+
+        for review in reviews:
+            response = admin_client.delete(
+                self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                    title_id=titles[0]['id'], review_id=review['id']
+                )
+            )
+            assert response.status_code == HTTPStatus.NO_CONTENT
+        assert admin_client.get(title_url).json().get('rating') is None, (
+            'Проверьте, что после удаления всех отзывов рейтинг '
+            f'произведения в ответе на GET-запрос к `{title_url}` '
+            'равен `None`.'
+        )
+
+    def test_08_reviews_list_query_count(
+            self, client, admin_client, admin, user_client, user,
+            moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == len(reviews)
+        assert len(context.captured_queries) == 3, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+            'проверяет существование произведения, считает отзывы и '
+            'получает их вместе с авторами - всего три запроса к БД.'
+        )
+
+        response = client.get(self.REVIEWS_URL_TEMPLATE.format(title_id=0))
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_09_duplicate_review_rejected_by_constraint(
+            self, client, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        create_single_review(user_client, titles[0]['id'], 'Первый', 7)
+
+        response = user_client.post(url, data={'text': 'Второй', 'score': 1})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'non_field_errors' in response.json(), (
+            'Проверьте, что при повторном отзыве на произведение ответ '
+            f'на POST-запрос к `{self.REVIEWS_URL_TEMPLATE}` содержит '
+            'ошибку в ключе `non_field_errors`.'
+        )
+        title = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        ).json()
+        assert title.get('rating') == 7, (
+            'Проверьте, что отклонённый повторный отзыв не влияет на '
+            'рейтинг произведения.'
+        )
+
+    def test_10_title_stats(self, client, admin_client, admin, user_client,
+                            user, moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        ) + 'stats/'
+        admin_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ),
+            data={'score': 9}
+        )
+        admin_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[1]['id']
+            )
+        )
+        scores = sorted(
+            review['score'] for review in client.get(
+                self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+            ).json()['results']
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert len(context.captured_queries) == 1, (
+            f'Проверьте, что GET-запрос к `{url}` выполняет один запрос к БД.'
+        )
+        data = response.json()
+        expected_scores = {
+            str(score): scores.count(score) for score in range(1, 11)
+        }
+        assert data['scores'] == expected_scores, (
+            f'Проверьте, что `{url}` возвращает количество отзывов для каждой '
+            'оценки с учётом изменённых и удалённых отзывов.'
+        )
+        assert data['review_count'] == len(scores)
+        assert data['mean'] == sum(scores) / len(scores)
+        middle = len(scores) // 2
+        assert data['median'] == (
+            scores[middle] if len(scores) % 2
+            else (scores[middle - 1] + scores[middle]) / 2
+        )
+
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[1]['id'])
+            + 'stats/'
+        )
+        assert response.json() == {
+            'review_count': 0, 'mean': None, 'median': None,
+            'scores': {str(score): 0 for score in range(1, 11)},
+        }
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=0) + 'stats/'
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_11_review_etag_depends_on_username(self, client, admin_client,
+                                                admin, user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        _, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        etag = client.get(url).get('ETag')
+
+        response = client.post(
+            '/api/v1/auth/signup/',
+            data={'email': 'new@yamdb.fake', 'username': 'new_user'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'bio': 'Биография'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что регистрация пользователей и изменение полей, '
+            f'которых нет в ответе, не меняют `ETag` `{url}`.'
+        )
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'username': 'renamed'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после смены имени автора `{url}` возвращает '
+            'новые данные, а не ответ 304.'
+        )
+        assert 'renamed' in {
+            review['author'] for review in response.json()['results']
+        }
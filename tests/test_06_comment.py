@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
+from api.user_auth_utils import get_tokens_for_user
 from tests.utils import (check_fields, check_pagination, create_comments,
                          create_reviews, create_single_comment)
 
@@ -14,6 +18,7 @@ class Test06CommentAPI:
     COMMENT_DETAIL_URL_TEMPLATE = (
         '/api/v1/titles/{title_id}/reviews/{review_id}/comments/{comment_id}/'
     )
+    USERS_TABLE_SELECT = 'FROM "users_yamdbuser" WHERE'
 
     def test_01_comment_not_auth(self, client, admin_client, admin,
                                  user_client, user, moderator_client,
@@ -366,3 +371,83 @@ class Test06CommentAPI:
             f'Проверьте, что PUT-запрос к `{self.COMMENT_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_08_comment_list_query_count(self, client, admin_client, admin,
+                                         user_client, user, moderator_client,
+                                         moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == len(comments)
+        assert len(context.captured_queries) == 3, (
+            f'Проверьте, что GET-запрос к `{self.COMMENTS_URL_TEMPLATE}` '
+            'проверяет существование отзыва, считает комментарии и получает '
+            'их вместе с авторами - всего три запроса к БД.'
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data={'text': 'Новый'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert len(context.captured_queries) <= 3, (
+            f'Проверьте, что POST-запрос к `{self.COMMENTS_URL_TEMPLATE}` '
+            'не загружает отзыв и произведение целиком.'
+        )
+
+        response = client.get(self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[1]['id'], review_id=reviews[0]['id']
+        ))
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что GET-запрос к '
+            f'`{self.COMMENTS_URL_TEMPLATE}` возвращает ответ со статусом '
+            '404, если отзыв относится к другому произведению.'
+        )
+
+    def test_09_comment_write_does_not_load_author(
+            self, admin_client, admin, user_client, user, moderator_client,
+            moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        clients = {}
+        for role_user in (user, moderator):
+            token = get_tokens_for_user(role_user)['token']
+            clients[role_user] = APIClient()
+            clients[role_user].credentials(
+                HTTP_AUTHORIZATION=f'Bearer {token}'
+            )
+
+        requests = (
+            (clients[user], 'patch', comments[1], HTTPStatus.OK),
+            (clients[user], 'delete', comments[0], HTTPStatus.FORBIDDEN),
+            (clients[moderator], 'delete', comments[0],
+             HTTPStatus.NO_CONTENT),
+            (clients[user], 'delete', comments[1], HTTPStatus.NO_CONTENT),
+        )
+        for client, method, comment, expected_status in requests:
+            url = self.COMMENT_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id'],
+                comment_id=comment['id']
+            )
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(client, method)(url, data={'text': 'Н'})
+            assert response.status_code == expected_status
+            assert not any(
+                self.USERS_TABLE_SELECT in query['sql']
+                for query in context.captured_queries
+            ), (
+                f'Проверьте, что {method.upper()}-запрос к '
+                f'`{self.COMMENT_DETAIL_URL_TEMPLATE}` проверяет права '
+                'доступа без отдельного запроса к таблице пользователей.'
+            )
@@ -0,0 +1,81 @@
+import re
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import GenreTitle
+from tests.utils import create_comments, create_titles
+
+
+def get_list_query(captured_queries, table):
+    """Находим запрос выборки страницы (не COUNT) к таблице."""
+    for query in captured_queries:
+        sql = query['sql']
+        if (sql.startswith('SELECT') and f'FROM "{table}"' in sql
+                and 'COUNT(' not in sql):
+            return sql
+    assert False, f'Не найден запрос к таблице `{table}`.'
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # На маленьких таблицах PostgreSQL предпочитает Seq Scan
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                cursor.execute(f'EXPLAIN {sql}')
+                return '\n'.join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return '\n'.join(row[-1] for row in cursor.fetchall())
+
+
+def assert_uses_index(url, sql, table):
+    plan = explain(sql)
+    if connection.vendor == 'postgresql':
+        full_scan = re.search(rf'Seq Scan on {table}\b', plan)
+    else:
+        full_scan = re.search(rf'SCAN {table}$', plan, re.MULTILINE)
+    assert not full_scan, (
+        f'Проверьте, что запрос к таблице `{table}` при GET-запросе к '
+        f'`{url}` использует индекс. План запроса:\n{plan}'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08Indexes:
+
+    def test_01_list_endpoints_use_indexes(self, client, admin_client, admin,
+                                           user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        _, reviews, titles = create_comments(admin_client, author_map)
+        endpoints = (
+            ('/api/v1/titles/', 'reviews_title'),
+            ('/api/v1/titles/?year=1984', 'reviews_title'),
+            ('/api/v1/titles/?pagination=cursor', 'reviews_title'),
+            (f'/api/v1/titles/{titles[0]["id"]}/reviews/', 'reviews_review'),
+            (
+                f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+                f'{reviews[0]["id"]}/comments/',
+                'reviews_comment'
+            ),
+        )
+        for url, table in endpoints:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            assert_uses_index(
+                url, get_list_query(context.captured_queries, table), table
+            )
+
+    def test_02_genre_title_pair_is_unique(self, admin_client):
+        create_titles(admin_client)
+        genre_title = GenreTitle.objects.first()
+        with pytest.raises(IntegrityError):
+            GenreTitle.objects.create(
+                genre_id=genre_title.genre_id, title_id=genre_title.title_id
+            )
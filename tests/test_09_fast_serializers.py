@@ -0,0 +1,75 @@
+import datetime
+import decimal
+
+import pytest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import (CommentValuesSerializer,
+                                  ReviewValuesSerializer,
+                                  TitleValuesSerializer)
+from api.renderers import FastJSONRenderer
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleSerializer)
+from api.views import TitleViewSet
+from reviews.models import Comment, Review, Title
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09FastSerializers:
+
+    def test_01_values_serializers_match_model_serializers(
+            self, admin_client, admin, user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        create_comments(admin_client, author_map)
+        # Произведение без категории и с дробным рейтингом
+        Title.objects.filter(
+            pk=Title.objects.order_by('id').last().pk
+        ).update(category=None, rating=7.5)
+
+        cases = (
+            (TitleViewSet.queryset.order_by('id'), TitleSerializer,
+             TitleValuesSerializer),
+            (Review.objects.select_related('author').order_by('id'),
+             ReviewSerializer, ReviewValuesSerializer),
+            (Comment.objects.select_related('author').order_by('id'),
+             CommentSerializer, CommentValuesSerializer),
+        )
+        renderer = JSONRenderer()
+        for queryset, serializer_class, fast_serializer_class in cases:
+            expected = renderer.render(
+                serializer_class(queryset, many=True).data
+            )
+            fast_serializer = fast_serializer_class()
+            received = renderer.render(fast_serializer.to_representation(
+                fast_serializer.prepare(queryset)
+            ))
+            assert received == expected, (
+                f'Проверьте, что `{fast_serializer_class.__name__}` '
+                f'возвращает те же данные, что и '
+                f'`{serializer_class.__name__}`.'
+            )
+
+    def test_02_fast_renderer_matches_json_renderer(self):
+        data = {
+            'text': 'Текст с \u2028 и "кавычками"',
+            'pub_date': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc
+            ),
+            'date': datetime.date(2024, 1, 2),
+            'score': decimal.Decimal('7.5'),
+            'message': gettext_lazy('Invalid value.'),
+            'items': [{'id': 1, 'rating': None}, (1, 2.5, True)],
+            'big': 2 ** 70,
+        }
+        for value in (data, [data, data], None, []):
+            assert FastJSONRenderer().render(value) == (
+                JSONRenderer().render(value)
+            ), 'Проверьте, что FastJSONRenderer совпадает с JSONRenderer.'
+        renderer = FastJSONRenderer()
+        assert b''.join(renderer.render_stream(iter([data] * 250))) == (
+            JSONRenderer().render([data] * 250)
+        )
+        assert b''.join(renderer.render_stream(iter([]))) == b'[]'
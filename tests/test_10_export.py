@@ -0,0 +1,110 @@
+import io
+import json
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.models import Category, Title
+from tests.utils import create_comments
+
+EXPORT_URL_TEMPLATE = '/api/v1/export/{dataset}/'
+
+
+def read_stream(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10Export:
+
+    def test_01_export_permissions(self, client, user_client, admin_client):
+        url = EXPORT_URL_TEMPLATE.format(dataset='titles')
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` доступен только администратору.'
+        )
+        response = admin_client.get(
+            EXPORT_URL_TEMPLATE.format(dataset='users')
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_02_titles_ndjson(self, admin_client, admin, user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        _, _, titles = create_comments(admin_client, author_map)
+        url = EXPORT_URL_TEMPLATE.format(dataset='titles')
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = [json.loads(line) for line in read_stream(response).split(
+            '\n'
+        ) if line]
+        exported = {item['id']: item for item in lines}
+        assert set(exported) == {title['id'] for title in titles}
+        for title in titles:
+            api_title = admin_client.get(
+                f'/api/v1/titles/{title["id"]}/'
+            ).json()
+            item = exported[title['id']]
+            assert item['category'] == api_title['category']['slug']
+            assert item['genre'] == [
+                genre['slug'] for genre in api_title['genre']
+            ], (
+                f'Проверьте, что `{url}` выгружает слаги жанров произведений.'
+            )
+            assert item['rating'] == Title.objects.get(pk=title['id']).rating
+
+    def test_03_csv_round_trip(self, tmp_path, admin_client, admin,
+                               user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        _, reviews, titles = create_comments(admin_client, author_map)
+        urls = [
+            '/api/v1/titles/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+            f'{reviews[0]["id"]}/comments/',
+        ]
+        expected = [admin_client.get(url).json() for url in urls]
+
+        datasets = []
+        for dataset, model in (('titles', 'Title'),
+                               ('genre_titles', 'GenreTitle'),
+                               ('reviews', 'Review'),
+                               ('comments', 'Comment')):
+            response = admin_client.get(
+                EXPORT_URL_TEMPLATE.format(dataset=dataset), {'format': 'csv'}
+            )
+            assert response.status_code == HTTPStatus.OK
+            assert response['Content-Type'].startswith('text/csv')
+            path = tmp_path / f'{dataset}.csv'
+            path.write_text(read_stream(response), encoding='utf-8')
+            datasets.append(f'reviews:{model}:{path}')
+
+        Title.objects.all().delete()
+        call_command('import_data', *datasets, stdout=io.StringIO())
+
+        received = [admin_client.get(url).json() for url in urls]
+        assert received == expected, (
+            'Проверьте, что CSV-выгрузка загружается командой import_data '
+            'без потери данных.'
+        )
+
+    def test_04_import_bad_rows(self, tmp_path):
+        for content, message in (
+            ('id,name,slug\n1,Книги,books\n,Фильмы,movies\n',
+             "строка 3: неверный первичный ключ ''"),
+            ('id,name,slug\nx,Книги,books\n',
+             "строка 2: неверный первичный ключ 'x'"),
+            ('id,name,slug\n1,Книги\n', 'строка 2: ожидается колонок 3'),
+        ):
+            path = tmp_path / 'category.csv'
+            path.write_text(content, encoding='utf-8')
+            with pytest.raises(CommandError, match=message):
+                call_command(
+                    'import_data', f'reviews:Category:{path}',
+                    stdout=io.StringIO()
+                )
+            assert not Category.objects.exists(), (
+                'Проверьте, что файл с ошибкой не загружается частично.'
+            )
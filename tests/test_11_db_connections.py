@@ -0,0 +1,43 @@
+import pytest
+from django.core.signals import request_started
+from django.db import connection
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11DBConnections:
+
+    @pytest.fixture
+    def persistent_connection(self, monkeypatch):
+        connection.ensure_connection()
+        monkeypatch.setitem(connection.settings_dict, 'CONN_MAX_AGE', 60)
+        # Срок жизни соединения не истёк
+        monkeypatch.setattr(connection, 'close_at', None)
+        closed = []
+        monkeypatch.setattr(connection, 'close', lambda: closed.append(True))
+        return closed
+
+    def test_01_broken_connection_closed(
+        self, monkeypatch, persistent_connection
+    ):
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        request_started.send(sender=self.__class__)
+        assert persistent_connection, (
+            'Проверьте, что в начале запроса неработающее постоянное '
+            'соединение с БД закрывается.'
+        )
+
+    def test_02_usable_connection_kept(
+        self, settings, monkeypatch, persistent_connection
+    ):
+        request_started.send(sender=self.__class__)
+        assert not persistent_connection, (
+            'Проверьте, что работающее постоянное соединение с БД '
+            'не закрывается в начале запроса.'
+        )
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        settings.DB_CONN_HEALTH_CHECKS = False
+        request_started.send(sender=self.__class__)
+        assert not persistent_connection, (
+            'Проверьте, что при DB_CONN_HEALTH_CHECKS=False соединение '
+            'не проверяется.'
+        )